@@ -2,29 +2,83 @@ from __future__ import annotations
 
 import argparse
 import asyncio
+import functools
+import hashlib
 import json
 import os
 import re
+import secrets
+import shlex
+import shutil
+import signal
+import tempfile
 import time
-from datetime import datetime
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any
-
-from agents import Agent, WebSearchTool, function_tool, set_default_openai_api
-from agents.mcp import MCPServerManager, MCPServerStdio, create_static_tool_filter
+from typing import TYPE_CHECKING, Any, BinaryIO
 
+from . import jsonio
 from .main import (
     ShellCommandLogger,
+    _async_timeout,
+    _is_windows,
     _shell_invocation,
     _truncate_text,
+    _utc_now_iso,
     acquire_repo,
     configure_openai_client_from_env,
+    install_pidfd_child_watcher,
     require_approval,
     run_with_retries,
 )
 
+if TYPE_CHECKING:
+    # agents/agents.mcp are imported where they are used so `--help` does not pay for them.
+    from agents.mcp import MCPServerStdio
+
+_RE_DIFF_GIT = re.compile(r"^diff --git a/(.+?) b/(.+)$")
+_RE_FENCED = re.compile(r"```(?:diff|patch)?\s*\n(.*?)\n```", re.DOTALL | re.IGNORECASE)
+_RE_MINUS_HDR = re.compile(r"(?m)^---\s+\S+")
+_RE_PLUS_HDR = re.compile(r"(?m)^\+\+\+\s+\S+")
+_RE_HUNK = re.compile(r"(?m)^@@\s")
+_RE_UNSAFE = re.compile(
+    r"(^|\s)(rm\s+-rf\s+/|mkfs\b|shutdown\b|reboot\b|dd\s+if=|git\s+reset\s+--hard\b|git\s+clean\s+-fdx\b)"
+)
+
+_MAX_JSON_PROBE_CHARS = 4 * 1024 * 1024
+# StreamReader limit for subprocess pipes; large outputs pause the transport less often.
+_STREAM_LIMIT_BYTES = 1024 * 1024
+_PATCH_CACHE_SIZE = 32
+
+_FS_TOOL_NAMES = (
+    "read_text_file",
+    "read_file",
+    "read_multiple_files",
+    "search_files",
+    "list_directory",
+    "get_file_info",
+    "write_file",
+    "edit_file",
+    "create_directory",
+    "move_file",
+)
+_GIT_TOOL_NAMES = (
+    "git_set_working_dir",
+    "git_status",
+    "git_diff",
+    "git_show",
+    "git_log",
+)
+_GIT_MCP_ENV = {
+    "MCP_TRANSPORT_TYPE": "stdio",
+    "MCP_LOG_LEVEL": "error",
+    "NODE_ENV": "production",
+}
+
 
 def _detect_api_mode(using_azure: bool) -> str:
+    from agents import set_default_openai_api
+
     api_mode = os.environ.get("OPENAI_API_MODE", "").strip().lower()
     if not api_mode and using_azure:
         api_mode = "responses"
@@ -47,38 +101,71 @@ def _safe_decode(data: bytes | None) -> str:
 def _extract_patch_paths(patch: str) -> list[str]:
     paths: list[str] = []
     seen: set[str] = set()
-    for line in patch.splitlines():
-        if line.startswith("+++ b/"):
-            p = line[6:].strip()
-            if p and p != "/dev/null" and p not in seen:
-                seen.add(p)
-                paths.append(p)
+    seen_add = seen.add
+    pos = 0
+    end = len(patch)
+    while pos < end:
+        eol = patch.find("\n", pos)
+        if eol < 0:
+            eol = end
+        line_start = pos
+        pos = eol + 1
+        if not patch.startswith(("diff --git ", "+++ b/"), line_start, eol):
             continue
 
-        m = re.match(r"^diff --git a/(.+?) b/(.+)$", line)
-        if m:
+        line = patch[line_start:eol]
+        if line[0] == "+":
+            p = line[6:].strip()
+        else:
+            m = _RE_DIFF_GIT.match(line)
+            if not m:
+                continue
             p = m.group(2).strip()
-            if p and p != "/dev/null" and p not in seen:
-                seen.add(p)
-                paths.append(p)
+        if p and p != "/dev/null" and p not in seen:
+            seen_add(p)
+            paths.append(p)
     return paths
 
 
 def _extract_first_fenced_block(text: str) -> str | None:
-    match = re.search(r"```(?:diff|patch)?\s*\n(.*?)\n```", text, flags=re.DOTALL | re.IGNORECASE)
+    match = _RE_FENCED.search(text)
     if match:
         return match.group(1).strip()
     return None
 
 
+# Keyed by a digest so retried multi-megabyte patches are not kept alive as cache keys.
+_normalized_patch_cache: OrderedDict[bytes, tuple[str, tuple[str, ...]]] = OrderedDict()
+
+
 def _normalize_patch_text(raw_patch: str) -> tuple[str, list[str]]:
+    key = hashlib.blake2b(raw_patch.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    cached = _normalized_patch_cache.get(key)
+    if cached is not None:
+        _normalized_patch_cache.move_to_end(key)
+    else:
+        candidate, notes = _normalize_patch_text_uncached(raw_patch)
+        cached = (candidate, tuple(notes))
+        _normalized_patch_cache[key] = cached
+        if len(_normalized_patch_cache) > _PATCH_CACHE_SIZE:
+            _normalized_patch_cache.popitem(last=False)
+    return cached[0], list(cached[1])
+
+
+def _normalize_patch_text_uncached(raw_patch: str) -> tuple[str, list[str]]:
     notes: list[str] = []
     candidate = raw_patch.strip()
 
-    # Sometimes the model sends {"patch":"..."} as a string payload.
-    if candidate.startswith("{") and candidate.endswith("}"):
+    # Sometimes the model sends {"patch":"..."} as a string payload. Only parse text that
+    # opens like a JSON object with a key, and never multi-megabyte blobs.
+    if (
+        candidate.startswith("{")
+        and candidate.endswith("}")
+        and len(candidate) < _MAX_JSON_PROBE_CHARS
+        and candidate[1:64].lstrip().startswith('"')
+    ):
         try:
-            obj = json.loads(candidate)
+            obj = jsonio.loads(candidate)
         except json.JSONDecodeError:
             obj = None
         if isinstance(obj, dict):
@@ -101,11 +188,9 @@ def _normalize_patch_text(raw_patch: str) -> tuple[str, list[str]]:
         notes.append("trimmed_to_diff_header")
 
     if diff_index < 0:
-        has_unified_headers = bool(re.search(r"(?m)^---\s+\S+", candidate)) and bool(
-            re.search(r"(?m)^\+\+\+\s+\S+", candidate)
-        )
+        has_unified_headers = bool(_RE_MINUS_HDR.search(candidate)) and bool(_RE_PLUS_HDR.search(candidate))
         if has_unified_headers:
-            first_header = re.search(r"(?m)^---\s+\S+", candidate)
+            first_header = _RE_MINUS_HDR.search(candidate)
             if first_header and first_header.start() > 0:
                 candidate = candidate[first_header.start() :]
                 notes.append("trimmed_to_unified_headers")
@@ -118,10 +203,40 @@ def _normalize_patch_text(raw_patch: str) -> tuple[str, list[str]]:
 
 
 def _looks_like_unified_diff(text: str) -> bool:
-    has_diff_header = "diff --git " in text
-    has_headers = bool(re.search(r"(?m)^---\s+\S+", text)) and bool(re.search(r"(?m)^\+\+\+\s+\S+", text))
-    has_hunk = bool(re.search(r"(?m)^@@\s", text))
-    return has_hunk and (has_diff_header or has_headers)
+    # Cheapest checks first; the header regexes only run for diffs without a git header.
+    if "@@" not in text or not _RE_HUNK.search(text):
+        return False
+    if "diff --git " in text:
+        return True
+    return bool(_RE_MINUS_HDR.search(text)) and bool(_RE_PLUS_HDR.search(text))
+
+
+def _merged_output_pieces(stdout: str, stderr: str) -> tuple[str, ...]:
+    # Same text as (stdout + stderr).strip(), without building the concatenation first.
+    if not stdout or stdout.isspace():
+        return (stderr.strip(),)
+    if not stderr or stderr.isspace():
+        return (stdout.strip(),)
+    return (stdout.lstrip(), stderr.rstrip())
+
+
+async def _feed_stdin(proc: asyncio.subprocess.Process, data: bytes) -> None:
+    if proc.stdin is None:
+        return
+    try:
+        proc.stdin.write(data)
+        await proc.stdin.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+    finally:
+        proc.stdin.close()
+
+
+async def _drain_to_file(stream: asyncio.StreamReader | None, handle: BinaryIO) -> None:
+    if stream is None:
+        return
+    while chunk := await stream.read(65536):
+        handle.write(chunk)
 
 
 async def _run_exec(
@@ -137,6 +252,7 @@ async def _run_exec(
         stdin=asyncio.subprocess.PIPE if stdin_text is not None else None,
         stdout=asyncio.subprocess.PIPE,
         stderr=asyncio.subprocess.PIPE,
+        limit=_STREAM_LIMIT_BYTES,
     )
 
     timed_out = False
@@ -161,47 +277,199 @@ async def _run_exec(
     )
 
 
-def build_code_shell_function_tool(cwd: Path, logger: ShellCommandLogger):
+class _ShellSession:
+    """Long-lived /bin/sh that runs each command in its own subshell, framed by sentinels.
+
+    The subshell keeps cd/exit/variable changes from leaking between commands, as with
+    one `sh -lc` per command. Its stdout/stderr are per-command FIFOs read to EOF, so
+    background jobs it starts report into that command's result, never a later one.
+    Calls that arrive while the session is busy run in their own shell instead.
+    """
+
+    def __init__(self, cwd: Path) -> None:
+        self.cwd = cwd
+        self._proc: asyncio.subprocess.Process | None = None
+        self._status_buf = bytearray()
+        self._lock = asyncio.Lock()
+        self._marker = f"__RRA_END_{secrets.token_hex(8)}__"
+        self._fifo_dir: str | None = None
+        self._seq = 0
+
+    async def _ensure_started(self) -> asyncio.subprocess.Process:
+        if self._proc is None or self._proc.returncode is not None:
+            self._status_buf.clear()
+            # The session's own streams only carry status lines and login-profile noise.
+            self._proc = await asyncio.create_subprocess_exec(
+                "/bin/sh",
+                "-l",
+                cwd=str(self.cwd),
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+                start_new_session=True,
+                limit=_STREAM_LIMIT_BYTES,
+            )
+        return self._proc
+
+    def _script(self, command: str, out_path: str, err_path: str) -> bytes:
+        return (
+            f"( eval {shlex.quote(command)} ) </dev/null >{shlex.quote(out_path)} 2>{shlex.quote(err_path)}; "
+            f"printf '\\n%d %s\\n' \"$?\" '{self._marker}'\n"
+        ).encode("utf-8")
+
+    async def _read_status(self, proc: asyncio.subprocess.Process) -> int:
+        # The status line is "\n<rc> <marker>\n"; anything before it is profile output.
+        sentinel = f" {self._marker}\n".encode()
+        buf = self._status_buf
+        start = 0
+        while (idx := buf.find(sentinel, start)) < 0:
+            start = max(0, len(buf) - len(sentinel) + 1)
+            chunk = await proc.stdout.read(65536)
+            if not chunk:
+                raise EOFError
+            buf += chunk
+        exit_code = int(buf[buf.rfind(b"\n", 0, idx) + 1 : idx])
+        del buf[: idx + len(sentinel)]
+        return exit_code
+
+    async def _open_fifo(self, path: str) -> tuple[asyncio.StreamReader, asyncio.ReadTransport, int]:
+        os.mkfifo(path, 0o600)
+        read_fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+        # Our own writer keeps the reader from seeing EOF before the subshell opens the FIFO.
+        hold_fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=_STREAM_LIMIT_BYTES, loop=loop)
+        transport, _ = await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader, loop=loop), os.fdopen(read_fd, "rb", buffering=0)
+        )
+        return reader, transport, hold_fd
+
+    def _kill(self, proc: asyncio.subprocess.Process) -> None:
+        # The session leads its own process group, so this also reaps background jobs.
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        self._proc = None
+
+    async def run(self, command: str, timeout_ms: int) -> tuple[int | None, str, str, bool, int]:
+        if self._lock.locked():
+            return await _run_exec(_shell_invocation(command), cwd=self.cwd, timeout_ms=timeout_ms)
+        async with self._lock:
+            started = time.perf_counter()
+            proc = await self._ensure_started()
+            if self._fifo_dir is None:
+                self._fifo_dir = tempfile.mkdtemp(prefix="rra-shell-")
+            self._seq += 1
+            out_path = os.path.join(self._fifo_dir, f"{self._seq}.out")
+            err_path = os.path.join(self._fifo_dir, f"{self._seq}.err")
+            opened = [await self._open_fifo(out_path), await self._open_fifo(err_path)]
+            (out_reader, _, _), (err_reader, _, _) = opened
+            holds = [hold_fd for _, _, hold_fd in opened]
+
+            def release_holds() -> None:
+                while holds:
+                    os.close(holds.pop())
+
+            timed_out = False
+            exit_code: int | None = None
+            try:
+                async with _async_timeout(max(1, timeout_ms / 1000)):
+                    try:
+                        proc.stdin.write(self._script(command, out_path, err_path))
+                        await proc.stdin.drain()
+                        exit_code = await self._read_status(proc)
+                    except (EOFError, BrokenPipeError, ConnectionResetError):
+                        # The command took the session shell down with it (e.g. `kill $$`).
+                        self._kill(proc)
+                        await proc.wait()
+                        exit_code = proc.returncode
+                    release_holds()
+                    # EOF only once every writer, background jobs included, has closed.
+                    stdout_b, stderr_b = await asyncio.gather(out_reader.read(), err_reader.read())
+            except asyncio.TimeoutError:
+                timed_out = True
+                exit_code = None
+                self._kill(proc)
+                release_holds()
+                await proc.wait()
+                try:
+                    # Only a writer that escaped the process group (e.g. via setsid) can stall this.
+                    async with _async_timeout(1):
+                        stdout_b, stderr_b = await asyncio.gather(out_reader.read(), err_reader.read())
+                except asyncio.TimeoutError:
+                    stdout_b, stderr_b = b"", b""
+            finally:
+                release_holds()
+                for _, transport, _ in opened:
+                    transport.close()
+                for path in (out_path, err_path):
+                    os.unlink(path)
+
+            duration_ms = int((time.perf_counter() - started) * 1000)
+            return exit_code, _safe_decode(stdout_b), _safe_decode(stderr_b), timed_out, duration_ms
+
+    async def close(self) -> None:
+        async with self._lock:
+            proc = self._proc
+            if proc is not None and proc.returncode is None:
+                if proc.stdin is not None:
+                    proc.stdin.close()
+                try:
+                    async with _async_timeout(5):
+                        await proc.wait()
+                except asyncio.TimeoutError:
+                    self._kill(proc)
+                    await proc.wait()
+            self._proc = None
+            if self._fifo_dir is not None:
+                shutil.rmtree(self._fifo_dir, ignore_errors=True)
+                self._fifo_dir = None
+
+
+def build_code_shell_function_tool(cwd: Path, logger: ShellCommandLogger, session: _ShellSession | None = None):
+    from agents import function_tool
+
     @function_tool(name_override="shell")
     async def shell(command: str | None = None, commands: list[str] | None = None, timeout_ms: int = 120_000) -> str:
         command_list: list[str] = []
-        if command and command.strip():
-            command_list.append(command.strip())
-        if commands:
-            command_list.extend([c.strip() for c in commands if c and c.strip()])
+        for raw in (command, *(commands or ())):
+            stripped = raw.strip() if raw else ""
+            if stripped:
+                command_list.append(stripped)
         if not command_list:
             return "No command provided."
 
-        unsafe = re.compile(
-            r"(^|\s)(rm\s+-rf\s+/|mkfs\b|shutdown\b|reboot\b|dd\s+if=|git\s+reset\s+--hard\b|git\s+clean\s+-fdx\b)"
-        )
-        for command_text in command_list:
-            if unsafe.search(command_text):
-                logger.log(
-                    source="code_shell_function",
-                    cwd=cwd,
-                    command=command_text,
-                    timeout_ms=timeout_ms,
-                    timed_out=False,
-                    exit_code=None,
-                    duration_ms=0,
-                    stdout="",
-                    stderr="",
-                    blocked=True,
-                    block_reason="unsafe_command_pattern",
-                )
-                return f"Blocked unsafe command: {command_text}"
-
-        await require_approval(command_list)
-
-        output_parts: list[str] = []
-        for command_text in command_list:
-            output_parts.append(f"$ {command_text}")
-            exit_code, stdout, stderr, timed_out, duration_ms = await _run_exec(
-                _shell_invocation(command_text),
+        blocked_command = next((c for c in command_list if _RE_UNSAFE.search(c)), None)
+        if blocked_command is not None:
+            logger.log(
+                source="code_shell_function",
                 cwd=cwd,
+                command=blocked_command,
                 timeout_ms=timeout_ms,
+                timed_out=False,
+                exit_code=None,
+                duration_ms=0,
+                stdout="",
+                stderr="",
+                blocked=True,
+                block_reason="unsafe_command_pattern",
             )
+            return f"Blocked unsafe command: {blocked_command}"
+
+        await require_approval(command_list)
+
+        # Flat list of string pieces joined once at the end, so large outputs are not re-copied per step.
+        chunks: list[str] = []
+        invocations = [(c, None if session is not None else _shell_invocation(c)) for c in command_list]
+        for command_text, argv in invocations:
+            if chunks:
+                chunks.append("\n")
+            chunks += ("$ ", command_text, "\n")
+            if argv is None:
+                exit_code, stdout, stderr, timed_out, duration_ms = await session.run(command_text, timeout_ms)
+            else:
+                exit_code, stdout, stderr, timed_out, duration_ms = await _run_exec(argv, cwd=cwd, timeout_ms=timeout_ms)
             logger.log(
                 source="code_shell_function",
                 cwd=cwd,
@@ -214,75 +482,75 @@ def build_code_shell_function_tool(cwd: Path, logger: ShellCommandLogger):
                 stderr=stderr,
             )
             if timed_out:
-                output_parts.append(f"Command timed out after {max(1, int(timeout_ms / 1000))}s")
-                output_parts.append("[exit_code=124]")
+                chunks += (f"Command timed out after {max(1, int(timeout_ms / 1000))}s", "\n", "[exit_code=124]")
                 break
 
-            merged = (stdout + stderr).strip()
-            output_parts.append(merged or "(no output)")
-            output_parts.append(f"[exit_code={exit_code}]")
-        return "\n".join(output_parts)
+            merged = _merged_output_pieces(stdout, stderr)
+            chunks += merged if merged[-1] else ("(no output)",)
+            chunks += ("\n", f"[exit_code={exit_code}]")
+        return "".join(chunks)
 
     return shell
 
 
-def build_local_mcp_servers(repo_path: Path) -> list[MCPServerStdio]:
+@functools.lru_cache(maxsize=1)
+def _resolve_mcp_paths() -> tuple[str, str, str, str]:
     project_root = Path(__file__).resolve().parents[2]
-    fs_server_path = (
-        project_root / ".mcp-node" / "node_modules" / "@modelcontextprotocol" / "server-filesystem" / "dist" / "index.js"
-    )
-    git_server_path = (
-        project_root / ".mcp-node" / "node_modules" / "@cyanheads" / "git-mcp-server" / "dist" / "index.js"
-    )
+    node_modules = project_root / ".mcp-node" / "node_modules"
+    fs_server_path = node_modules / "@modelcontextprotocol" / "server-filesystem" / "dist" / "index.js"
+    git_server_path = node_modules / "@cyanheads" / "git-mcp-server" / "dist" / "index.js"
     if not fs_server_path.exists() or not git_server_path.exists():
         raise FileNotFoundError(
             "MCP servers are not installed. Install with: cd .mcp-node && npm install @modelcontextprotocol/server-filesystem @cyanheads/git-mcp-server"
         )
+    # project_root is already resolved, so the logs dir needs no second resolve().
+    logs_dir = project_root / ".agent-workspace" / "mcp-git-logs"
+    return str(project_root), str(fs_server_path), str(git_server_path), str(logs_dir)
 
-    repo_abs = str(repo_path.resolve())
-    runtime_path = os.environ.get("PATH", "").strip() or "/usr/local/bin:/usr/bin:/bin:/usr/sbin:/sbin"
-    git_env = dict(os.environ)
-    git_env.update(
-        {
-            "MCP_TRANSPORT_TYPE": "stdio",
-            "MCP_LOG_LEVEL": "error",
-            "NODE_ENV": "production",
-            "LOGS_DIR": str((project_root / ".agent-workspace" / "mcp-git-logs").resolve()),
-            "GIT_BASE_DIR": repo_abs,
-            "PATH": runtime_path,
-        }
-    )
-    fs_tool_filter = create_static_tool_filter(
-        allowed_tool_names=[
-            "read_text_file",
-            "read_file",
-            "read_multiple_files",
-            "search_files",
-            "list_directory",
-            "get_file_info",
-            "write_file",
-            "edit_file",
-            "create_directory",
-            "move_file",
-        ]
-    )
-    git_tool_filter = create_static_tool_filter(
-        allowed_tool_names=[
-            "git_set_working_dir",
-            "git_status",
-            "git_diff",
-            "git_show",
-            "git_log",
-        ]
+
+def _prefetch_mcp_paths() -> None:
+    try:
+        _resolve_mcp_paths()
+    except FileNotFoundError:
+        # Not cached; build_local_mcp_servers repeats the check and raises it in context.
+        pass
+
+
+@functools.lru_cache(maxsize=1)
+def _mcp_tool_filters() -> tuple[Any, Any]:
+    # Built once per process; the agents SDK only reads these static filters.
+    from agents.mcp import create_static_tool_filter
+
+    return (
+        create_static_tool_filter(allowed_tool_names=list(_FS_TOOL_NAMES)),
+        create_static_tool_filter(allowed_tool_names=list(_GIT_TOOL_NAMES)),
     )
 
+
+def build_local_mcp_servers(repo_path: Path) -> list[MCPServerStdio]:
+    from agents.mcp import MCPServerStdio
+
+    project_root, fs_server_path, git_server_path, logs_dir = _resolve_mcp_paths()
+
+    # acquire_repo already hands back resolved paths; only relative ones need resolving.
+    repo_abs = str(repo_path if repo_path.is_absolute() else repo_path.resolve())
+    runtime_path = os.environ.get("PATH", "").strip() or "/usr/local/bin:/usr/bin:/bin:/usr/sbin:/sbin"
+    git_env = {
+        **os.environ,
+        **_GIT_MCP_ENV,
+        "LOGS_DIR": logs_dir,
+        "GIT_BASE_DIR": repo_abs,
+        "PATH": runtime_path,
+    }
+    fs_tool_filter, git_tool_filter = _mcp_tool_filters()
+
     return [
         MCPServerStdio(
             name="filesystem",
             params={
                 "command": "node",
-                "args": [str(fs_server_path), repo_abs],
-                "cwd": str(project_root),
+                "args": [fs_server_path, repo_abs],
+                "cwd": project_root,
             },
             cache_tools_list=True,
             tool_filter=fs_tool_filter,
@@ -291,7 +559,7 @@ def build_local_mcp_servers(repo_path: Path) -> list[MCPServerStdio]:
             name="git",
             params={
                 "command": "node",
-                "args": [str(git_server_path)],
+                "args": [git_server_path],
                 "cwd": repo_abs,
                 "env": git_env,
             },
@@ -355,33 +623,54 @@ Deliverables:
 """
 
 
+def _decode_report_text(data: bytes) -> str:
+    # Same result as Path.read_text(errors="replace"), including universal newlines.
+    return data.decode("utf-8", errors="replace").replace("\r\n", "\n").replace("\r", "\n")
+
+
 def _load_analysis_context(path_raw: str, max_chars: int) -> str | None:
     path_raw = (path_raw or "").strip()
     if not path_raw:
         return None
     path = Path(path_raw).expanduser().resolve()
-    if not path.exists():
-        raise FileNotFoundError(f"Analysis report not found: {path}")
-    content = path.read_text(encoding="utf-8", errors="replace")
-    return _truncate_text(content, max_chars)
+    try:
+        handle = path.open("rb")
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Analysis report not found: {path}") from None
+    with handle:
+        if max_chars <= 0:
+            return ""
+        # A UTF-8 character is at most 4 bytes, so this prefix always holds max_chars characters.
+        budget = max_chars * 4
+        size = os.fstat(handle.fileno()).st_size
+        if size <= budget:
+            return _truncate_text(_decode_report_text(handle.read()), max_chars)
+        head = _decode_report_text(handle.read(budget))[:max_chars]
+    # Counted from st_size so the rest is never read or decoded; bytes, hence the "~".
+    return head + f"\n... [truncated ~{size - len(head.encode('utf-8'))} bytes]"
 
 
 async def run_code_agent(args: argparse.Namespace) -> dict[str, Any]:
+    from agents import Agent, WebSearchTool
+    from agents.mcp import MCPServerManager
+
     workspace_root = Path(args.workspace).expanduser().resolve()
     workspace_root.mkdir(parents=True, exist_ok=True)
-    started_at = datetime.utcnow()
+    started_at = time.time()
 
-    run_stamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    run_stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime(started_at))
     run_dir = workspace_root / f"code-run-{run_stamp}"
     run_dir.mkdir(parents=True, exist_ok=True)
 
-    repo_path = acquire_repo(args.repo, run_dir)
+    backend = (getattr(args, "backend", "agents_sdk") or "agents_sdk").strip().lower()
+    # Stat the MCP server entry points on a worker thread while the repo is cloned.
+    mcp_paths_check = asyncio.ensure_future(asyncio.to_thread(_prefetch_mcp_paths)) if backend == "agents_sdk" else None
+    repo_path = await asyncio.to_thread(acquire_repo, args.repo, run_dir)
     command_log_path = run_dir / "commands.jsonl"
     logger = ShellCommandLogger(log_path=command_log_path, max_output_chars=args.command_log_max_output_chars)
 
     analysis_context = _load_analysis_context(args.analysis_report, max_chars=args.analysis_context_max_chars)
 
-    backend = (getattr(args, "backend", "agents_sdk") or "agents_sdk").strip().lower()
     using_azure = bool(os.environ.get("AZURE_OPENAI_ENDPOINT", "").strip() or os.environ.get("ENDPOINT", "").strip())
     azure_deployment = os.environ.get("AZURE_OPENAI_DEPLOYMENT", "").strip()
     endpoint_used = (
@@ -392,11 +681,14 @@ async def run_code_agent(args: argparse.Namespace) -> dict[str, Any]:
     api_mode = os.environ.get("OPENAI_API_MODE", "").strip().lower() or "responses"
 
     tools: list[Any] = []
+    shell_session: _ShellSession | None = None
     if backend == "agents_sdk":
         using_azure = configure_openai_client_from_env()
         api_mode = _detect_api_mode(using_azure=using_azure)
         if args.enable_shell_fallback:
-            tools.append(build_code_shell_function_tool(repo_path, logger=logger))
+            if not _is_windows():
+                shell_session = _ShellSession(repo_path)
+            tools.append(build_code_shell_function_tool(repo_path, logger=logger, session=shell_session))
         if args.enable_web_search:
             tools.append(WebSearchTool())
 
@@ -404,6 +696,7 @@ async def run_code_agent(args: argparse.Namespace) -> dict[str, Any]:
     if using_azure and args.model in {"gpt-5.1-codex", "gpt-5.1-codex-mini"} and azure_deployment:
         model_name = azure_deployment
 
+    requested_output_path = Path(args.output).expanduser().resolve() if args.output else None
     final_output = ""
     status = "failed"
     error_message = ""
@@ -440,24 +733,29 @@ async def run_code_agent(args: argparse.Namespace) -> dict[str, Any]:
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
             )
-            try:
-                stdout_b, stderr_b = await asyncio.wait_for(
-                    proc.communicate(prompt.encode("utf-8")),
-                    timeout=max(30, int(getattr(args, "codex_timeout_seconds", 600))),
-                )
-            except asyncio.TimeoutError:
-                proc.kill()
-                stdout_b, stderr_b = await proc.communicate()
-                codex_stdout_path.write_text(_safe_decode(stdout_b), encoding="utf-8")
-                codex_stderr_path.write_text(_safe_decode(stderr_b), encoding="utf-8")
-                raise RuntimeError(
-                    f"codex exec timed out after {int(getattr(args, 'codex_timeout_seconds', 600))}s. "
-                    f"See {codex_stdout_path} and {codex_stderr_path}."
-                )
-            stdout = _safe_decode(stdout_b)
-            stderr = _safe_decode(stderr_b)
-            codex_stdout_path.write_text(stdout, encoding="utf-8")
-            codex_stderr_path.write_text(stderr, encoding="utf-8")
+            codex_timeout_seconds = int(getattr(args, "codex_timeout_seconds", 600))
+            with codex_stdout_path.open("wb") as stdout_file, codex_stderr_path.open("wb") as stderr_file:
+                try:
+                    await asyncio.wait_for(
+                        asyncio.gather(
+                            _feed_stdin(proc, prompt.encode("utf-8")),
+                            _drain_to_file(proc.stdout, stdout_file),
+                            _drain_to_file(proc.stderr, stderr_file),
+                            proc.wait(),
+                        ),
+                        timeout=max(30, codex_timeout_seconds),
+                    )
+                except asyncio.TimeoutError:
+                    proc.kill()
+                    await asyncio.gather(
+                        _drain_to_file(proc.stdout, stdout_file),
+                        _drain_to_file(proc.stderr, stderr_file),
+                        proc.wait(),
+                    )
+                    raise RuntimeError(
+                        f"codex exec timed out after {codex_timeout_seconds}s. "
+                        f"See {codex_stdout_path} and {codex_stderr_path}."
+                    )
 
             if proc.returncode != 0:
                 raise RuntimeError(
@@ -468,12 +766,12 @@ async def run_code_agent(args: argparse.Namespace) -> dict[str, Any]:
             if last_message_path.exists():
                 final_output = last_message_path.read_text(encoding="utf-8", errors="replace")
             else:
-                final_output = stdout.strip()
+                final_output = codex_stdout_path.read_text(encoding="utf-8", errors="replace").strip()
 
             status = "completed"
             mcp_server_names = ["codex_cli"]
-            if args.output:
-                output_path = Path(args.output).expanduser().resolve()
+            if requested_output_path:
+                output_path = requested_output_path
                 output_path.parent.mkdir(parents=True, exist_ok=True)
                 output_path.write_text(final_output, encoding="utf-8")
                 print(f"Saved output to {output_path}")
@@ -485,6 +783,8 @@ async def run_code_agent(args: argparse.Namespace) -> dict[str, Any]:
                 "output_path": output_path,
             }
 
+        if mcp_paths_check is not None:
+            await mcp_paths_check
         mcp_servers = build_local_mcp_servers(repo_path=repo_path)
         async with MCPServerManager(
             mcp_servers,
@@ -516,8 +816,8 @@ async def run_code_agent(args: argparse.Namespace) -> dict[str, Any]:
             final_output = str(result.final_output)
             status = "completed"
 
-            if args.output:
-                output_path = Path(args.output).expanduser().resolve()
+            if requested_output_path:
+                output_path = requested_output_path
                 output_path.parent.mkdir(parents=True, exist_ok=True)
                 output_path.write_text(final_output, encoding="utf-8")
                 print(f"Saved output to {output_path}")
@@ -532,13 +832,15 @@ async def run_code_agent(args: argparse.Namespace) -> dict[str, Any]:
         error_message = str(exc)
         raise
     finally:
+        if shell_session is not None:
+            await shell_session.close()
         diagnostics_path = logger.write_summary(run_dir=run_dir)
         summary_path = run_dir / "run-summary.json"
         summary_payload = {
             "run_id": run_dir.name,
             "run_dir": str(run_dir),
-            "started_at_utc": started_at.isoformat(timespec="seconds") + "Z",
-            "finished_at_utc": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "started_at_utc": _utc_now_iso(started_at),
+            "finished_at_utc": _utc_now_iso(),
             "repo_input": args.repo,
             "repo_path": str(repo_path),
             "analysis_report": args.analysis_report,
@@ -555,7 +857,7 @@ async def run_code_agent(args: argparse.Namespace) -> dict[str, Any]:
             "command_log_path": str(command_log_path),
             "command_diagnostics_path": str(diagnostics_path),
         }
-        summary_path.write_text(json.dumps(summary_payload, indent=2, ensure_ascii=True) + "\n", encoding="utf-8")
+        jsonio.write_json(summary_path, summary_payload, indent=True)
         print(f"Command log written to {command_log_path}")
         print(f"Command diagnostics written to {diagnostics_path}")
         print(f"Run summary written to {summary_path}")
@@ -626,6 +928,7 @@ def parse_args() -> argparse.Namespace:
 
 def entrypoint() -> None:
     args = parse_args()
+    install_pidfd_child_watcher()
     run_result = asyncio.run(run_code_agent(args))
     if not args.output:
         print(run_result["final_output"])
@@ -5,15 +5,7 @@ from pathlib import Path
 
 from .quality import ValidationResult, validate_report
 from .report_parser import parse_report
-from .storage import (
-    connect_db,
-    init_schema,
-    insert_evidence,
-    insert_features,
-    insert_recommendations,
-    insert_report,
-    insert_stories,
-)
+from .storage import connect_db, init_schema, insert_report_bundle
 
 
 def ingest_report_to_db(
@@ -35,22 +27,24 @@ def ingest_report_to_db(
     )
     conn = connect_db(db_path)
     init_schema(conn)
-    report_id = insert_report(
-        conn,
-        title=parsed.title,
-        repo=repo,
-        model=model,
-        report_path=str(report_path.resolve()) if report_path else None,
-        markdown=report_markdown,
-        validation_status="passed" if computed_validation.passed else "warning",
-        validation_errors="\n".join(computed_validation.errors),
-        validation_error_count=len(computed_validation.errors),
-    )
-    insert_features(conn, report_id, parsed.features)
-    insert_stories(conn, report_id, parsed.stories)
-    insert_recommendations(conn, report_id, parsed.recommendations)
-    insert_evidence(conn, report_id, parsed.evidence)
-    conn.close()
+    try:
+        report_id = insert_report_bundle(
+            conn,
+            title=parsed.title,
+            repo=repo,
+            model=model,
+            report_path=str(report_path.resolve()) if report_path else None,
+            markdown=report_markdown,
+            validation_status="passed" if computed_validation.passed else "warning",
+            validation_errors="\n".join(computed_validation.errors),
+            validation_error_count=len(computed_validation.errors),
+            features=parsed.features,
+            stories=parsed.stories,
+            recommendations=parsed.recommendations,
+            evidence=parsed.evidence,
+        )
+    finally:
+        conn.close()
     return report_id
 
 
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps_bytes(payload: Any, *, indent: bool = False) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload, option=orjson.OPT_INDENT_2 if indent else 0)
+        except orjson.JSONEncodeError:
+            # e.g. lone surrogates from model-supplied text; the stdlib escapes those.
+            pass
+    return json.dumps(payload, indent=2 if indent else None, ensure_ascii=True).encode("ascii")
+
+
+def write_json(path: Path, payload: Any, *, indent: bool = False) -> None:
+    # Serialize straight to newline-terminated bytes so the payload is never copied as str.
+    if orjson is not None:
+        option = orjson.OPT_APPEND_NEWLINE | (orjson.OPT_INDENT_2 if indent else 0)
+        try:
+            path.write_bytes(orjson.dumps(payload, option=option))
+            return
+        except orjson.JSONEncodeError:
+            pass
+    path.write_bytes(dumps_bytes(payload, indent=indent) + b"\n")
+
+
+def loads(data: str | bytes) -> Any:
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch one type.
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
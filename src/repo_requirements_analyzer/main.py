@@ -2,38 +2,47 @@ from __future__ import annotations
 
 import argparse
 import asyncio
-import json
+import contextlib
+import functools
 import os
+import random
 import re
+import secrets
 import shlex
 import shutil
+import signal
+import sys
 import time
 from collections.abc import Sequence
 from dataclasses import dataclass
-from datetime import datetime
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 from urllib.parse import urlparse
 
-from agents import (
-    Agent,
-    Runner,
-    ShellCallOutcome,
-    ShellCommandOutput,
-    ShellCommandRequest,
-    ShellResult,
-    ShellTool,
-    WebSearchTool,
-    function_tool,
-    set_default_openai_client,
-    set_default_openai_api,
-)
-from openai import APIConnectionError, AsyncAzureOpenAI, RateLimitError
-
+from . import jsonio
 from .ingest import ingest_report_to_db
 from .quality import ValidationResult, append_quality_warning, validate_report
 from .scan import build_scan, write_scan
 
+if sys.version_info >= (3, 11):
+    from asyncio import timeout as _async_timeout
+else:
+    from async_timeout import timeout as _async_timeout
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+_DISALLOWED_CMD_RE = re.compile(r"^\s*(rm|mv|dd|mkfs|shutdown|reboot|git\s+reset|git\s+clean)\b")
+# Per-stream ceiling for shell output held in memory; anything past it is read and discarded.
+_MAX_STREAM_BYTES = 1024 * 1024
+
+if TYPE_CHECKING:
+    # The agents SDK (and openai under it) is slow to import; runtime imports are local to the
+    # functions that need them so CLI parsing and the helpers here stay cheap to import.
+    from agents import Agent, ShellCommandRequest, ShellResult
+
 
 @dataclass
 class AnalysisRunResult:
@@ -48,12 +57,34 @@ def _is_windows() -> bool:
     return os.name == "nt"
 
 
-def _shell_invocation(command: str) -> list[str]:
+def _detect_shell_prefix() -> tuple[str, ...]:
     if _is_windows():
-        if shutil.which("pwsh"):
-            return ["pwsh", "-NoProfile", "-Command", command]
-        return ["powershell", "-NoProfile", "-Command", command]
-    return ["/bin/sh", "-lc", command]
+        return ("pwsh" if shutil.which("pwsh") else "powershell", "-NoProfile", "-Command")
+    return ("/bin/sh", "-lc")
+
+
+# Resolved once per process: shutil.which walks PATH and stats each entry.
+_SHELL_PREFIX = _detect_shell_prefix()
+
+
+def _shell_invocation(command: str) -> list[str]:
+    return [*_SHELL_PREFIX, command]
+
+
+def _utc_now_iso(epoch: float | None = None) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(epoch))
+
+
+def install_pidfd_child_watcher() -> None:
+    # Before 3.12 asyncio reaps each subprocess from a dedicated waiter thread; a pidfd watcher
+    # waits on the event loop itself. 3.12+ already prefers pidfds when the kernel has them.
+    if sys.version_info >= (3, 12) or not hasattr(os, "pidfd_open"):
+        return
+    try:
+        os.close(os.pidfd_open(os.getpid()))
+    except OSError:
+        return
+    asyncio.set_child_watcher(asyncio.PidfdChildWatcher())
 
 
 def _truncate_text(text: str, max_chars: int) -> str:
@@ -64,17 +95,228 @@ def _truncate_text(text: str, max_chars: int) -> str:
     return text[:max_chars] + f"\n... [truncated {len(text) - max_chars} chars]"
 
 
-def _append_jsonl(path: Path, payload: dict[str, Any]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(payload, ensure_ascii=True) + "\n")
+class _CappedOutput:
+    """Collects a subprocess stream, keeping at most `cap` bytes and draining the rest."""
+
+    def __init__(self, cap: int):
+        self.cap = cap
+        self.data = bytearray()
+        self.dropped = 0
+
+    def extend(self, chunk: bytes) -> None:
+        room = self.cap - len(self.data)
+        self.data += chunk[:room]
+        self.dropped += max(0, len(chunk) - room)
+
+    async def drain(self, stream: asyncio.StreamReader | None) -> None:
+        if stream is None:
+            return
+        while chunk := await stream.read(65536):
+            self.extend(chunk)
+
+    def text(self) -> str:
+        text = self.data.decode(errors="replace")
+        if self.dropped:
+            text += f"\n... [truncated {self.dropped} bytes]"
+        return text
+
+
+async def _communicate_capped(proc: asyncio.subprocess.Process, timeout_s: float) -> tuple[str, str, bool]:
+    stdout = _CappedOutput(_MAX_STREAM_BYTES)
+    stderr = _CappedOutput(_MAX_STREAM_BYTES)
+    try:
+        async with _async_timeout(timeout_s):
+            await asyncio.gather(stdout.drain(proc.stdout), stderr.drain(proc.stderr), proc.wait())
+        return stdout.text(), stderr.text(), False
+    except asyncio.TimeoutError:
+        # Keep what was captured before the deadline instead of draining again after the kill.
+        _kill_process_group(proc)
+        await proc.wait()
+        return stdout.text(), stderr.text(), True
+
+
+class _MarkedOutput:
+    """Splits a batched shell stream into per-command outputs at `\\n<marker> <rc>\\n` lines."""
+
+    def __init__(self, marker: str, cap: int):
+        self._needle = b"\n" + marker.encode("ascii") + b" "
+        self._pending = bytearray()
+        self.cap = cap
+        self.current = _CappedOutput(cap)
+        self.segments: list[tuple[str, int]] = []
+
+    def feed(self, chunk: bytes) -> None:
+        pending = self._pending
+        pending += chunk
+        while True:
+            idx = pending.find(self._needle)
+            eol = pending.find(b"\n", idx + len(self._needle)) if idx >= 0 else -1
+            if eol < 0:
+                break
+            self.current.extend(bytes(pending[:idx]))
+            self.segments.append((self.current.text(), int(pending[idx + len(self._needle) : eol])))
+            self.current = _CappedOutput(self.cap)
+            del pending[: eol + 1]
+        # Everything before a possible (partial) marker is plain output of the running command.
+        spill = idx if idx >= 0 else len(pending) - len(self._needle)
+        if spill > 0:
+            self.current.extend(bytes(pending[:spill]))
+            del pending[:spill]
+
+    async def drain(self, stream: asyncio.StreamReader | None) -> None:
+        if stream is None:
+            return
+        while chunk := await stream.read(65536):
+            self.feed(chunk)
+
+    def partial_text(self) -> str:
+        self.current.extend(bytes(self._pending))
+        self._pending.clear()
+        return self.current.text()
+
+
+@dataclass(slots=True)
+class _CommandRun:
+    command: str
+    stdout: str
+    stderr: str
+    exit_code: int | None
+    duration_ms: int
+    timed_out: bool
+
+
+async def _run_single_command(command: str, cwd: Path, timeout_s: float) -> _CommandRun:
+    started = time.perf_counter()
+    proc = await asyncio.create_subprocess_exec(
+        *_shell_invocation(command),
+        cwd=str(cwd),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=True,
+    )
+    stdout, stderr, timed_out = await _communicate_capped(proc, timeout_s)
+    duration_ms = int((time.perf_counter() - started) * 1000)
+    return _CommandRun(command, stdout, stderr, None if timed_out else proc.returncode, duration_ms, timed_out)
+
+
+async def _run_batched_commands(commands: list[str], cwd: Path, timeout_s: float) -> list[_CommandRun]:
+    # One shell for the whole batch. Each command runs in its own subshell (so `exit` or `cd`
+    # stay local), then both streams get a marker line carrying its exit status.
+    marker = f"__rra_{secrets.token_hex(16)}__"
+    script = "".join(
+        f"( eval {shlex.quote(command)} ); __rra_rc=$?; "
+        f"printf '\\n%s %d\\n' {marker} \"$__rra_rc\"; printf '\\n%s %d\\n' {marker} \"$__rra_rc\" >&2\n"
+        for command in commands
+    )
+    proc = await asyncio.create_subprocess_exec(
+        *_shell_invocation(script),
+        cwd=str(cwd),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=True,
+    )
+    stdout = _MarkedOutput(marker, _MAX_STREAM_BYTES)
+    stderr = _MarkedOutput(marker, _MAX_STREAM_BYTES)
+    stderr_task = asyncio.ensure_future(stderr.drain(proc.stderr))
+    durations: list[int] = []
+    started = time.perf_counter()
+    timed_out = False
+    try:
+        while len(durations) < len(commands):
+            # Each command gets the full per-command timeout, counted from when the previous one ended.
+            async with _async_timeout(timeout_s):
+                while len(stdout.segments) == len(durations):
+                    chunk = await proc.stdout.read(65536)
+                    if not chunk:
+                        break
+                    stdout.feed(chunk)
+            finished = time.perf_counter()
+            if len(stdout.segments) == len(durations):
+                break
+            # Several markers can arrive in one read; the elapsed time belongs to the first of
+            # them, and the rest finished within that same read.
+            durations.append(int((finished - started) * 1000))
+            durations += [0] * (len(stdout.segments) - len(durations))
+            started = finished
+    except asyncio.TimeoutError:
+        timed_out = True
+        _kill_process_group(proc)
+    try:
+        # A backgrounded child can keep the pipes (and so proc.wait()) open long after the
+        # shell has exited; give it one more timeout, then take the whole group down.
+        async with _async_timeout(timeout_s):
+            await asyncio.gather(proc.wait(), asyncio.shield(stderr_task))
+    except asyncio.TimeoutError:
+        _kill_process_group(proc)
+        await proc.wait()
+        await stderr_task
+
+    runs = [
+        _CommandRun(command, out, stderr.segments[i][0] if i < len(stderr.segments) else "", rc, duration, False)
+        for i, (command, (out, rc), duration) in enumerate(zip(commands, stdout.segments, durations))
+    ]
+    if len(runs) < len(commands):
+        # The command that timed out (or that ended the shell itself) reports its partial output.
+        index = len(runs)
+        err = stderr.segments[index][0] if index < len(stderr.segments) else stderr.partial_text()
+        runs.append(
+            _CommandRun(
+                commands[index],
+                stdout.partial_text(),
+                err,
+                None if timed_out else proc.returncode,
+                int((time.perf_counter() - started) * 1000),
+                timed_out,
+            )
+        )
+    return runs
+
+
+def _kill_process_group(proc: asyncio.subprocess.Process) -> None:
+    # Commands start in their own session, so this also reaps pipelines and background children
+    # that would otherwise keep the pipes (and proc.wait()) open past the timeout.
+    if _is_windows():
+        proc.kill()
+        return
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def _append_jsonl(path: Path, line: bytes) -> None:
+    with path.open("ab") as f:
+        f.write(line)
+
+
+@dataclass(slots=True)
+class ShellCommandEvent:
+    timestamp_utc: str
+    source: str
+    cwd: str
+    command: str
+    timeout_ms: int
+    timed_out: bool
+    exit_code: int | None
+    duration_ms: int
+    blocked: bool
+    block_reason: str
+    stdout: str
+    stderr: str
+
+    def to_dict(self) -> dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
 
 
 class ShellCommandLogger:
+    SUMMARY_FILENAME = "command-diagnostics.json"
+
     def __init__(self, log_path: Path, max_output_chars: int = 4000):
         self.log_path = log_path
+        # Created once here so per-event appends never need to stat the directory again.
+        log_path.parent.mkdir(parents=True, exist_ok=True)
         self.max_output_chars = max_output_chars
-        self.events: list[dict[str, Any]] = []
+        self.events: list[ShellCommandEvent] = []
 
     def log(
         self,
@@ -91,45 +333,43 @@ class ShellCommandLogger:
         blocked: bool = False,
         block_reason: str = "",
     ) -> None:
-        event = {
-            "timestamp_utc": datetime.utcnow().isoformat(timespec="seconds") + "Z",
-            "source": source,
-            "cwd": str(cwd),
-            "command": command,
-            "timeout_ms": timeout_ms,
-            "timed_out": timed_out,
-            "exit_code": exit_code,
-            "duration_ms": duration_ms,
-            "blocked": blocked,
-            "block_reason": block_reason,
-            "stdout": _truncate_text(stdout, self.max_output_chars),
-            "stderr": _truncate_text(stderr, self.max_output_chars),
-        }
+        event = ShellCommandEvent(
+            timestamp_utc=_utc_now_iso(),
+            source=source,
+            cwd=str(cwd),
+            command=command,
+            timeout_ms=timeout_ms,
+            timed_out=timed_out,
+            exit_code=exit_code,
+            duration_ms=duration_ms,
+            blocked=blocked,
+            block_reason=block_reason,
+            stdout=_truncate_text(stdout, self.max_output_chars),
+            stderr=_truncate_text(stderr, self.max_output_chars),
+        )
         self.events.append(event)
-        _append_jsonl(self.log_path, event)
+        # One append per event keeps the audit log tail-able and loses nothing on a hard kill.
+        _append_jsonl(self.log_path, jsonio.dumps_bytes(event.to_dict()) + b"\n")
 
     def write_summary(self, run_dir: Path) -> Path:
-        summary_path = run_dir / "command-diagnostics.json"
+        summary_path = run_dir / self.SUMMARY_FILENAME
         total = len(self.events)
-        timed_out = sum(1 for e in self.events if e.get("timed_out"))
-        blocked = sum(1 for e in self.events if e.get("blocked"))
+        timed_out = sum(1 for e in self.events if e.timed_out)
+        blocked = sum(1 for e in self.events if e.blocked)
         failures = sum(
             1
             for e in self.events
-            if not e.get("blocked")
-            and not e.get("timed_out")
-            and isinstance(e.get("exit_code"), int)
-            and e.get("exit_code") != 0
+            if not e.blocked and not e.timed_out and isinstance(e.exit_code, int) and e.exit_code != 0
         )
         summary = {
-            "generated_at_utc": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "generated_at_utc": _utc_now_iso(),
             "log_path": str(self.log_path),
             "total_commands": total,
             "failed_commands": failures,
             "timed_out_commands": timed_out,
             "blocked_commands": blocked,
         }
-        summary_path.write_text(json.dumps(summary, indent=2, ensure_ascii=True) + "\n", encoding="utf-8")
+        jsonio.write_json(summary_path, summary, indent=True)
         return summary_path
 
 
@@ -155,6 +395,8 @@ class ShellExecutor:
         self.default_timeout_ms = default_timeout_ms
 
     async def __call__(self, request: ShellCommandRequest) -> ShellResult:
+        from agents import ShellCallOutcome, ShellCommandOutput, ShellResult
+
         action = request.data.action
         await require_approval(action.commands)
 
@@ -168,18 +410,10 @@ class ShellExecutor:
                 cwd=str(self.cwd),
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
+                start_new_session=True,
             )
 
-            timed_out = False
-            try:
-                stdout_bytes, stderr_bytes = await asyncio.wait_for(proc.communicate(), timeout=timeout_s)
-            except asyncio.TimeoutError:
-                timed_out = True
-                proc.kill()
-                stdout_bytes, stderr_bytes = await proc.communicate()
-
-            stdout = (stdout_bytes or b"").decode(errors="replace")
-            stderr = (stderr_bytes or b"").decode(errors="replace")
+            stdout, stderr, timed_out = await _communicate_capped(proc, timeout_s)
 
             if timed_out:
                 outcome = ShellCallOutcome(type="timeout", exit_code=None)
@@ -257,33 +491,53 @@ Quality gates:
 """
 
 
+# Operation paths people paste along with an Azure endpoint; the client wants the bare origin.
+_OPENAI_PATH_SUFFIXES = (
+    "/openai/responses",
+    "/openai/chat/completions",
+    "/openai/v1/responses",
+    "/openai/v1/chat/completions",
+)
+
+
+@functools.lru_cache(maxsize=8)
+def _strip_openai_suffix(url: str) -> str:
+    parsed = urlparse(url)
+    if parsed.scheme and parsed.netloc and parsed.path:
+        path = parsed.path.rstrip("/")
+        if path.endswith(_OPENAI_PATH_SUFFIXES):
+            return f"{parsed.scheme}://{parsed.netloc}"
+    return url
+
+
+def _env(*names: str) -> str:
+    """First non-blank value among the given environment variables, stripped."""
+    for name in names:
+        value = os.environ.get(name, "").strip()
+        if value:
+            return value
+    return ""
+
+
 def configure_openai_client_from_env() -> bool:
-    azure_endpoint = os.environ.get("AZURE_OPENAI_ENDPOINT", "").strip() or os.environ.get("ENDPOINT", "").strip()
+    azure_endpoint = _env("AZURE_OPENAI_ENDPOINT", "ENDPOINT")
     if not azure_endpoint:
         return False
 
-    api_key = os.environ.get("AZURE_OPENAI_API_KEY", "").strip() or os.environ.get("OPENAI_API_KEY", "").strip()
+    api_key = _env("AZURE_OPENAI_API_KEY", "OPENAI_API_KEY")
     if not api_key:
         raise ValueError("Azure endpoint is set, but no key found. Set AZURE_OPENAI_API_KEY or OPENAI_API_KEY.")
 
-    api_version = os.environ.get("AZURE_OPENAI_API_VERSION", "").strip()
+    api_version = _env("AZURE_OPENAI_API_VERSION")
     if not api_version:
         raise ValueError("AZURE_OPENAI_API_VERSION is required when using Azure OpenAI.")
 
-    azure_deployment = os.environ.get("AZURE_OPENAI_DEPLOYMENT", "").strip() or None
+    azure_deployment = _env("AZURE_OPENAI_DEPLOYMENT") or None
 
-    parsed = urlparse(azure_endpoint)
-    if parsed.scheme and parsed.netloc and parsed.path:
-        path = parsed.path.rstrip("/")
-        for suffix in (
-            "/openai/responses",
-            "/openai/chat/completions",
-            "/openai/v1/responses",
-            "/openai/v1/chat/completions",
-        ):
-            if path.endswith(suffix):
-                azure_endpoint = f"{parsed.scheme}://{parsed.netloc}"
-                break
+    azure_endpoint = _strip_openai_suffix(azure_endpoint)
+
+    from agents import set_default_openai_client
+    from openai import AsyncAzureOpenAI
 
     azure_client = AsyncAzureOpenAI(
         azure_endpoint=azure_endpoint,
@@ -295,20 +549,21 @@ def configure_openai_client_from_env() -> bool:
     return True
 
 
-def build_chat_shell_function_tool(cwd: Path, logger: ShellCommandLogger):
+def build_chat_shell_function_tool(cwd: Path, logger: ShellCommandLogger, batch_commands: bool = True):
+    from agents import function_tool
+
     @function_tool(name_override="shell")
     async def shell(command: str | None = None, commands: list[str] | None = None, timeout_ms: int = 120_000) -> str:
         command_list: list[str] = []
-        if command and command.strip():
-            command_list.append(command.strip())
-        if commands:
-            command_list.extend([c.strip() for c in commands if c and c.strip()])
+        for raw in (command, *(commands or ())):
+            stripped = raw.strip() if raw else ""
+            if stripped:
+                command_list.append(stripped)
         if not command_list:
             return "No command provided."
 
-        disallowed = re.compile(r"^\s*(rm|mv|dd|mkfs|shutdown|reboot|git\s+reset|git\s+clean)\b")
         for command_text in command_list:
-            if disallowed.search(command_text):
+            if _DISALLOWED_CMD_RE.search(command_text):
                 logger.log(
                     source="azure_shell_function",
                     cwd=cwd,
@@ -326,76 +581,117 @@ def build_chat_shell_function_tool(cwd: Path, logger: ShellCommandLogger):
 
         await require_approval(command_list)
 
-        output_parts: list[str] = []
         timeout_s = max(1, timeout_ms / 1000)
-        for command_text in command_list:
-            output_parts.append(f"$ {command_text}")
-            started = time.perf_counter()
-            proc = await asyncio.create_subprocess_exec(
-                *_shell_invocation(command_text),
-                cwd=str(cwd),
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-            try:
-                stdout_b, stderr_b = await asyncio.wait_for(proc.communicate(), timeout=timeout_s)
-                stdout = (stdout_b or b"").decode(errors="replace")
-                stderr = (stderr_b or b"").decode(errors="replace")
-                duration_ms = int((time.perf_counter() - started) * 1000)
-                logger.log(
-                    source="azure_shell_function",
-                    cwd=cwd,
-                    command=command_text,
-                    timeout_ms=timeout_ms,
-                    timed_out=False,
-                    exit_code=proc.returncode,
-                    duration_ms=duration_ms,
-                    stdout=stdout,
-                    stderr=stderr,
-                )
-                output_parts.append((stdout + stderr).strip() or "(no output)")
-                output_parts.append(f"[exit_code={proc.returncode}]")
-            except asyncio.TimeoutError:
-                proc.kill()
-                stdout_b, stderr_b = await proc.communicate()
-                stdout = (stdout_b or b"").decode(errors="replace")
-                stderr = (stderr_b or b"").decode(errors="replace")
-                duration_ms = int((time.perf_counter() - started) * 1000)
+        if batch_commands and len(command_list) > 1 and not _is_windows():
+            runs = await _run_batched_commands(command_list, cwd, timeout_s)
+        else:
+            runs = []
+            for command_text in command_list:
+                runs.append(await _run_single_command(command_text, cwd, timeout_s))
+                if runs[-1].timed_out:
+                    break
+
+        output_parts: list[str] = []
+        for run in runs:
+            output_parts.append(f"$ {run.command}")
+            if run.timed_out:
                 logger.log(
                     source="azure_shell_function",
                     cwd=cwd,
-                    command=command_text,
+                    command=run.command,
                     timeout_ms=timeout_ms,
                     timed_out=True,
                     exit_code=None,
-                    duration_ms=duration_ms,
-                    stdout=stdout,
-                    stderr=stderr or f"Command timed out after {int(timeout_s)}s",
+                    duration_ms=run.duration_ms,
+                    stdout=run.stdout,
+                    stderr=run.stderr or f"Command timed out after {int(timeout_s)}s",
                 )
                 output_parts.append(f"Command timed out after {int(timeout_s)}s")
                 output_parts.append("[exit_code=124]")
                 break
+            logger.log(
+                source="azure_shell_function",
+                cwd=cwd,
+                command=run.command,
+                timeout_ms=timeout_ms,
+                timed_out=False,
+                exit_code=run.exit_code,
+                duration_ms=run.duration_ms,
+                stdout=run.stdout,
+                stderr=run.stderr,
+            )
+            output_parts.append((run.stdout + run.stderr).strip() or "(no output)")
+            output_parts.append(f"[exit_code={run.exit_code}]")
         return "\n".join(output_parts)
 
     return shell
 
 
+def _git(*args: str):
+    import subprocess
+
+    return subprocess.run(["git", *args], text=True, capture_output=True)
+
+
+@contextlib.contextmanager
+def _clone_cache_lock(cache_dir: Path):
+    # Runs sharing a workspace serialize on the cache entry, so one never refreshes
+    # (or rmtree's) a clone another run is still creating or cloning from.
+    cache_dir.parent.mkdir(parents=True, exist_ok=True)
+    with open(cache_dir.with_suffix(".lock"), "a") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        yield
+
+
+def _refresh_clone_cache(repo: str, cache_dir: Path) -> bool:
+    # A shallow bare clone per remote, shared by all runs in the workspace. Repeat runs only
+    # fetch the new tip instead of re-downloading the whole snapshot.
+    if (cache_dir / "HEAD").is_file():
+        fetched = _git("-C", str(cache_dir), "fetch", "--quiet", "--depth", "1", "origin", "HEAD")
+        if fetched.returncode != 0:
+            return False
+        return _git("-C", str(cache_dir), "update-ref", "HEAD", "FETCH_HEAD").returncode == 0
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    cloned = _git("clone", "--quiet", "--bare", "--depth", "1", "--single-branch", repo, str(cache_dir))
+    return cloned.returncode == 0
+
+
+def _clone_from_cache(repo: str, target: Path, cache_dir: Path) -> bool:
+    import hashlib
+
+    cache_dir = cache_dir / hashlib.sha256(repo.encode("utf-8")).hexdigest()[:16]
+    with _clone_cache_lock(cache_dir):
+        if not _refresh_clone_cache(repo, cache_dir):
+            return False
+        # A local clone hardlinks the cached objects; origin is then pointed back at the real remote.
+        cloned = _git("clone", "--quiet", str(cache_dir), str(target)).returncode == 0
+    if not cloned:
+        shutil.rmtree(target, ignore_errors=True)
+        return False
+    _git("-C", str(target), "remote", "set-url", "origin", repo)
+    return True
+
+
 def acquire_repo(repo: str, run_dir: Path) -> Path:
     repo_path = Path(repo).expanduser()
     if repo_path.exists():
         return repo_path.resolve()
 
     target = run_dir / "repo"
-    cmd = ["git", "clone", "--depth", "1", repo, str(target)]
-    import subprocess
+    if _clone_from_cache(repo, target, run_dir.parent / "repo-cache"):
+        return target.resolve()
 
-    completed = subprocess.run(cmd, text=True, capture_output=True)
+    completed = _git("clone", "--depth", "1", "--single-branch", repo, str(target))
     if completed.returncode != 0:
         raise RuntimeError(f"Failed to clone repository: {completed.stderr or completed.stdout}")
     return target.resolve()
 
 
 async def run_with_retries(agent: Agent, input_text: str, max_turns: int, retries: int, backoff_seconds: float):
+    from agents import Runner
+    from openai import APIConnectionError, RateLimitError
+
     attempt = 0
     while True:
         try:
@@ -404,24 +700,31 @@ async def run_with_retries(agent: Agent, input_text: str, max_turns: int, retrie
             attempt += 1
             if attempt > retries:
                 raise
-            sleep_s = backoff_seconds * (2 ** (attempt - 1))
+            # +/-20% jitter so concurrent runs hitting the same rate limit do not retry in lockstep.
+            sleep_s = backoff_seconds * (2 ** (attempt - 1)) * random.uniform(0.8, 1.2)
             print(f"Retrying after transient API error ({exc.__class__.__name__}) in {sleep_s:.1f}s...")
-            time.sleep(sleep_s)
+            await asyncio.sleep(sleep_s)
+
+
+def _build_and_write_scan(repo_path: Path, scan_path: Path) -> None:
+    write_scan(build_scan(repo_path), scan_path)
 
 
 async def run_analysis(args: argparse.Namespace) -> AnalysisRunResult:
+    from agents import Agent, ShellTool, WebSearchTool, set_default_openai_api
+
     if args.skip_validation:
         print("Note: --skip-validation is deprecated; validation still runs in warning-only mode.")
 
     workspace_root = Path(args.workspace).expanduser().resolve()
     workspace_root.mkdir(parents=True, exist_ok=True)
-    started_at = datetime.utcnow()
+    started_at = time.time()
 
-    run_stamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    run_stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime(started_at))
     run_dir = workspace_root / f"run-{run_stamp}"
     run_dir.mkdir(parents=True, exist_ok=True)
 
-    repo_path = acquire_repo(args.repo, run_dir)
+    repo_path = await asyncio.to_thread(acquire_repo, args.repo, run_dir)
 
     log_path_raw = (args.command_log_path or "").strip()
     if log_path_raw:
@@ -431,41 +734,31 @@ async def run_analysis(args: argparse.Namespace) -> AnalysisRunResult:
     logger = ShellCommandLogger(log_path=command_log_path, max_output_chars=args.command_log_max_output_chars)
 
     scan_path = run_dir / "scan.json"
-    scan = build_scan(repo_path)
-    write_scan(scan, scan_path)
-
-    using_azure = configure_openai_client_from_env()
-    azure_deployment = os.environ.get("AZURE_OPENAI_DEPLOYMENT", "").strip()
+    # The scan walks the whole checkout; run it on a worker thread while the client is configured.
+    scan_task = asyncio.ensure_future(asyncio.to_thread(_build_and_write_scan, repo_path, scan_path))
+    try:
+        using_azure = configure_openai_client_from_env()
+    except BaseException:
+        await asyncio.gather(scan_task, return_exceptions=True)
+        raise
+    azure_deployment = _env("AZURE_OPENAI_DEPLOYMENT")
     endpoint_used = (
-        os.environ.get("AZURE_OPENAI_ENDPOINT", "").strip() or os.environ.get("ENDPOINT", "").strip()
+        _env("AZURE_OPENAI_ENDPOINT", "ENDPOINT")
         if using_azure
         else os.environ.get("OPENAI_BASE_URL", "https://api.openai.com/v1").strip()
     )
     if using_azure and endpoint_used:
-        parsed = urlparse(endpoint_used)
-        if parsed.scheme and parsed.netloc and parsed.path:
-            path = parsed.path.rstrip("/")
-            for suffix in (
-                "/openai/responses",
-                "/openai/chat/completions",
-                "/openai/v1/responses",
-                "/openai/v1/chat/completions",
-            ):
-                if path.endswith(suffix):
-                    endpoint_used = f"{parsed.scheme}://{parsed.netloc}"
-                    break
+        endpoint_used = _strip_openai_suffix(endpoint_used)
 
-    api_mode = os.environ.get("OPENAI_API_MODE", "").strip().lower()
-    if not api_mode and using_azure:
-        api_mode = "responses"
-    if not api_mode:
-        api_mode = "responses"
+    await scan_task
+
+    api_mode = _env("OPENAI_API_MODE").lower() or "responses"
 
     if api_mode == "chat_completions":
         set_default_openai_api("chat_completions")
     elif api_mode == "responses":
         set_default_openai_api("responses")
-    elif api_mode:
+    else:
         raise ValueError("OPENAI_API_MODE must be 'responses' or 'chat_completions'.")
 
     if api_mode == "chat_completions" or using_azure:
@@ -520,13 +813,14 @@ async def run_analysis(args: argparse.Namespace) -> AnalysisRunResult:
             report = append_quality_warning(report, validation_result)
             run_status = "completed_with_warnings"
 
-        report_path.write_text(report, encoding="utf-8")
-        print(f"Saved run report to {report_path}")
-
+        report_writes = [asyncio.to_thread(report_path.write_text, report, encoding="utf-8")]
         if args.output:
             output_copy_path = Path(args.output).expanduser().resolve()
             output_copy_path.parent.mkdir(parents=True, exist_ok=True)
-            output_copy_path.write_text(report, encoding="utf-8")
+            report_writes.append(asyncio.to_thread(output_copy_path.write_text, report, encoding="utf-8"))
+        await asyncio.gather(*report_writes)
+        print(f"Saved run report to {report_path}")
+        if output_copy_path is not None:
             print(f"Saved output copy to {output_copy_path}")
 
         return AnalysisRunResult(
@@ -540,13 +834,13 @@ async def run_analysis(args: argparse.Namespace) -> AnalysisRunResult:
         error_message = str(exc)
         raise
     finally:
-        diagnostics_path = logger.write_summary(run_dir=run_dir)
+        diagnostics_path = run_dir / ShellCommandLogger.SUMMARY_FILENAME
         summary_path = run_dir / "run-summary.json"
         summary_payload = {
             "run_id": run_dir.name,
             "run_dir": str(run_dir),
-            "started_at_utc": started_at.isoformat(timespec="seconds") + "Z",
-            "finished_at_utc": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "started_at_utc": _utc_now_iso(started_at),
+            "finished_at_utc": _utc_now_iso(),
             "repo_input": args.repo,
             "repo_path": str(repo_path),
             "scan_path": str(scan_path),
@@ -571,7 +865,11 @@ async def run_analysis(args: argparse.Namespace) -> AnalysisRunResult:
             "command_log_path": str(command_log_path),
             "command_diagnostics_path": str(diagnostics_path),
         }
-        summary_path.write_text(json.dumps(summary_payload, indent=2, ensure_ascii=True) + "\n", encoding="utf-8")
+        # Independent files; write them side by side off the event loop.
+        await asyncio.gather(
+            asyncio.to_thread(logger.write_summary, run_dir),
+            asyncio.to_thread(jsonio.write_json, summary_path, summary_payload, indent=True),
+        )
         print(f"Command log written to {command_log_path}")
         print(f"Command diagnostics written to {diagnostics_path}")
         print(f"Run summary written to {summary_path}")
@@ -655,6 +953,7 @@ def parse_args() -> argparse.Namespace:
 
 def entrypoint() -> None:
     args = parse_args()
+    install_pidfd_child_watcher()
     run_result = asyncio.run(run_analysis(args))
     report = run_result.report
     validation_result = run_result.validation_result
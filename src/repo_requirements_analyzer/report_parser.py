@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import re
+from collections.abc import Iterator
 from dataclasses import dataclass
 
 from .storage import EvidenceRecord, FeatureRecord, RecommendationRecord, StoryRecord
@@ -19,78 +20,92 @@ SECTION_RE = re.compile(
     r"^(?:##\s+(\d+)\.\s+(.+)|\*\*(\d+)\.\s+(.+?)\*\*)\s*$",
     flags=re.MULTILINE,
 )
+_WS_RE = re.compile(r"\s+")
+_TABLE_SEP_RE = re.compile(r"\|\s*:?-+:?\s*(\|\s*:?-+:?\s*)+\|?")
+# Lines arrive right-stripped: a "### " heading, an *italic* domain, or a "- " bullet.
+_FEATURE_LINE_RE = re.compile(r"### (?P<heading>.*)|\s*\*(?P<italic>.+)\*|\s*- (?P<bullet>.*)")
+_STORY_LINE_RE = re.compile(r"^(\d+)\.\s+(As a .+)$", flags=re.IGNORECASE)
+_PERSONA_BOLD_RE = re.compile(r"^As a\s+\*\*(.+?)\*\*", flags=re.IGNORECASE)
+_PERSONA_PLAIN_RE = re.compile(r"^As a[n]?\s+([^,]+),", flags=re.IGNORECASE)
+_BACKTICK_RE = re.compile(r"`([^`]+)`")
+_NUMBERED_RE = re.compile(r"^(\d+)\.\s+(.+)$")
 
 
 def _section_map(markdown: str) -> dict[int, str]:
-    matches = list(SECTION_RE.finditer(markdown))
+    # Forward pass: each heading closes the section opened by the previous one.
     out: dict[int, str] = {}
-    for idx, match in enumerate(matches):
-        section_num = int(match.group(1) or match.group(3))
-        start = match.end()
-        end = matches[idx + 1].start() if idx + 1 < len(matches) else len(markdown)
-        out[section_num] = markdown[start:end].strip()
+    prev_num: int | None = None
+    prev_end = 0
+    for match in SECTION_RE.finditer(markdown):
+        if prev_num is not None:
+            out[prev_num] = markdown[prev_end : match.start()].strip()
+        prev_num = int(match.group(1) or match.group(3))
+        prev_end = match.end()
+    if prev_num is not None:
+        out[prev_num] = markdown[prev_end:].strip()
     return out
 
 
+def _section_lines(sections: dict[int, str], num: int) -> list[str]:
+    # Split and right-strip once; every parser then only needs lstrip().
+    return [line.rstrip() for line in sections.get(num, "").splitlines()]
+
+
 def _first_sentence(text: str) -> str:
-    clean = re.sub(r"\s+", " ", text).strip()
+    clean = _WS_RE.sub(" ", text).strip()
     if not clean:
         return "Untitled Analysis"
     sentence = clean.split(".")[0].strip()
     return sentence[:120] if sentence else "Untitled Analysis"
 
 
-def _parse_markdown_table(section_text: str) -> list[list[str]]:
-    rows: list[list[str]] = []
-    for line in section_text.splitlines():
-        line = line.strip()
+def _parse_markdown_table(lines: list[str]) -> Iterator[list[str]]:
+    for line in lines:
+        line = line.lstrip()
         if not line.startswith("|"):
             continue
         # Skip markdown table separator rows.
-        if re.fullmatch(r"\|\s*:?-+:?\s*(\|\s*:?-+:?\s*)+\|?", line):
+        if _TABLE_SEP_RE.fullmatch(line):
             continue
-        cells = [cell.strip() for cell in line.strip("|").split("|")]
-        rows.append(cells)
-    return rows
+        yield [cell.strip() for cell in line.strip("|").split("|")]
 
 
-def _parse_features(section_text: str) -> list[FeatureRecord]:
+def _parse_features(lines: list[str]) -> list[FeatureRecord]:
     features: list[FeatureRecord] = []
     current_domain = "General"
-    for raw_line in section_text.splitlines():
-        line = raw_line.rstrip()
-        if line.startswith("### "):
-            current_domain = line[4:].strip() or "General"
-            continue
-        italic_domain = re.match(r"^\*(.+)\*\s*$", line.strip())
-        if italic_domain:
-            current_domain = italic_domain.group(1).strip() or "General"
+    for line in lines:
+        m = _FEATURE_LINE_RE.fullmatch(line)
+        if not m:
             continue
-        if line.lstrip().startswith("- "):
-            text = line.lstrip()[2:].strip()
+        kind = m.lastgroup
+        if kind == "bullet":
+            text = m.group("bullet").strip()
             if text:
                 features.append(FeatureRecord(domain=current_domain, feature_text=text))
+        else:
+            current_domain = m.group(kind).strip() or "General"
     return features
 
 
-def _parse_stories(section_text: str) -> list[StoryRecord]:
-    rows = _parse_markdown_table(section_text)
-    if not rows:
+def _parse_stories(lines: list[str]) -> list[StoryRecord]:
+    rows = _parse_markdown_table(lines)
+    first = next(rows, None)
+    if first is None:
         # Fallback for numbered list format:
         # 1. As a **Persona**, I want..., so that... (`file.php`)
         stories: list[StoryRecord] = []
-        for raw_line in section_text.splitlines():
-            line = raw_line.strip()
-            m = re.match(r"^(\d+)\.\s+(As a .+)$", line, flags=re.IGNORECASE)
+        for raw_line in lines:
+            line = raw_line.lstrip()
+            m = _STORY_LINE_RE.match(line)
             if not m:
                 continue
             story_num = int(m.group(1))
             story_text = m.group(2).strip()
-            persona_match = re.search(r"^As a\s+\*\*(.+?)\*\*", story_text, flags=re.IGNORECASE)
+            persona_match = _PERSONA_BOLD_RE.search(story_text)
             if not persona_match:
-                persona_match = re.search(r"^As a[n]?\s+([^,]+),", story_text, flags=re.IGNORECASE)
+                persona_match = _PERSONA_PLAIN_RE.search(story_text)
             persona = persona_match.group(1).strip() if persona_match else "Unknown"
-            evidence_matches = re.findall(r"`([^`]+)`", story_text)
+            evidence_matches = _BACKTICK_RE.findall(story_text)
             evidence = ", ".join(evidence_matches)
             stories.append(
                 StoryRecord(
@@ -102,15 +117,18 @@ def _parse_stories(section_text: str) -> list[StoryRecord]:
             )
         return stories
 
-    header = [c.lower() for c in rows[0]]
+    # First occurrence wins, as with list.index().
+    header: dict[str, int] = {}
+    for i, col in enumerate(first):
+        header.setdefault(col.lower(), i)
     # Expect: #, Persona, Story, Evidence
-    idx_num = header.index("#") if "#" in header else 0
-    idx_persona = header.index("persona") if "persona" in header else 1
-    idx_story = header.index("story") if "story" in header else 2
-    idx_evidence = header.index("evidence") if "evidence" in header else 3
+    idx_num = header.get("#", 0)
+    idx_persona = header.get("persona", 1)
+    idx_story = header.get("story", 2)
+    idx_evidence = header.get("evidence", 3)
 
     stories: list[StoryRecord] = []
-    for row in rows[1:]:
+    for row in rows:
         if len(row) <= max(idx_num, idx_persona, idx_story, idx_evidence):
             continue
         num_text = row[idx_num].strip()
@@ -129,23 +147,24 @@ def _parse_stories(section_text: str) -> list[StoryRecord]:
     return stories
 
 
-def _parse_recommendations(section_text: str) -> list[RecommendationRecord]:
+def _parse_recommendations(lines: list[str]) -> list[RecommendationRecord]:
     recs: list[RecommendationRecord] = []
-    for raw_line in section_text.splitlines():
-        line = raw_line.strip()
-        m = re.match(r"^(\d+)\.\s+(.+)$", line)
+    for raw_line in lines:
+        line = raw_line.lstrip()
+        m = _NUMBERED_RE.match(line)
         if not m:
             continue
         recs.append(RecommendationRecord(item_num=int(m.group(1)), text=m.group(2).strip()))
     return recs
 
 
-def _parse_evidence(section_text: str) -> list[EvidenceRecord]:
-    rows = _parse_markdown_table(section_text)
-    if len(rows) < 2:
+def _parse_evidence(lines: list[str]) -> list[EvidenceRecord]:
+    rows = _parse_markdown_table(lines)
+    first = next(rows, None)
+    if first is None:
         return []
 
-    header = [c.lower() for c in rows[0]]
+    header = [c.lower() for c in first]
     idx_item = 0
     idx_source = 1 if len(header) > 1 else 0
     for i, col in enumerate(header):
@@ -155,7 +174,7 @@ def _parse_evidence(section_text: str) -> list[EvidenceRecord]:
             idx_source = i
 
     evidence: list[EvidenceRecord] = []
-    for row in rows[1:]:
+    for row in rows:
         if len(row) <= max(idx_item, idx_source):
             continue
         evidence.append(EvidenceRecord(item=row[idx_item].strip(), source_paths=row[idx_source].strip()))
@@ -168,8 +187,8 @@ def parse_report(markdown: str) -> ParsedReport:
     title = _first_sentence(summary)
     return ParsedReport(
         title=title,
-        features=_parse_features(sections.get(3, "")),
-        stories=_parse_stories(sections.get(4, "")),
-        recommendations=_parse_recommendations(sections.get(8, "")),
-        evidence=_parse_evidence(sections.get(6, "")),
+        features=_parse_features(_section_lines(sections, 3)),
+        stories=_parse_stories(_section_lines(sections, 4)),
+        recommendations=_parse_recommendations(_section_lines(sections, 8)),
+        evidence=_parse_evidence(_section_lines(sections, 6)),
     )
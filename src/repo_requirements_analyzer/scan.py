@@ -1,10 +1,14 @@
 from __future__ import annotations
 
-import json
+import functools
+import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 
+from . import jsonio
+
 
 @dataclass
 class RepoScan:
@@ -28,68 +32,112 @@ class RepoScan:
         }
 
 
+# One pass per file for endpoints, tables, CLI commands and routes. The leading
+# lookahead lets the engine skip positions that cannot start any alternative.
+_SCAN_RE = re.compile(
+    r"(?=[@rRcCaApP<])(?:"
+    r"(?i:(?:@app|router)\.(?P<method>get|post|put|patch|delete)\(\s*['\"](?P<endpoint>[^'\"]+)['\"])"
+    r"|(?i:\bCREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(?P<table>[a-zA-Z0-9_]+))"
+    r"|add_parser\(\s*['\"](?P<cli>[^'\"]+)['\"]"
+    r"|(?i:(?:<Route\s+path=|path\s*:\s*)['\"](?P<route>[^'\"]+)['\"])"
+    r")"
+)
+
+
+# re.ASCII keeps IGNORECASE equivalent to matching on rel.lower().
+_SCAN_HINT_RE = re.compile(r"api\.py|router|routes|sql|schema|cli\.py|app\.tsx|pages", re.I | re.A)
+_TEST_HINT_RE = re.compile(r"/tests/|test_|_test\.|spec\.", re.I | re.A)
+
+_PRUNE_DIRS = {".git", "node_modules", ".venv", "__pycache__", "dist", "build", ".mypy_cache"}
+
+
+def _may_match(content: str) -> bool:
+    # Literal anchors of every _SCAN_RE alternative; most files have none of them.
+    if "add_parser(" in content:
+        return True
+    lowered = content.lower()
+    return "@app." in lowered or "router." in lowered or "table" in lowered or "path" in lowered
+
+
 def _safe_read(path: Path, max_chars: int = 200_000) -> str:
     try:
-        return path.read_text(encoding="utf-8", errors="ignore")[:max_chars]
-    except Exception:
+        st = os.stat(path)
+    except OSError:
+        return ""
+    return _safe_read_cached(os.fspath(path), st.st_mtime_ns, st.st_size, max_chars)
+
+
+# Keyed on mtime and size so edits between scans (e.g. workflow retries) invalidate entries.
+@functools.lru_cache(maxsize=256)
+def _safe_read_cached(path: str, mtime_ns: int, size: int, max_chars: int) -> str:
+    # UTF-8 needs at most 4 bytes per char, so never read past that budget.
+    try:
+        with open(path, "rb", buffering=0) as handle:
+            data = handle.read(max_chars * 4)
+    except OSError:
         return ""
+    text = data.decode("utf-8", errors="ignore")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text[:max_chars]
+
+
+def _scan_file(path: Path) -> tuple[list[str], list[str], list[str], list[str]]:
+    # Plain lists per file; build_scan dedupes with one set.update per category.
+    endpoints: list[str] = []
+    tables: list[str] = []
+    commands: list[str] = []
+    routes: list[str] = []
+    content = _safe_read(path)
+    if not content or not _may_match(content):
+        return endpoints, tables, commands, routes
+
+    for m in _SCAN_RE.finditer(content):
+        kind = m.lastgroup
+        if kind == "endpoint":
+            endpoints.append(f"{m.group('method').upper()} {m.group('endpoint')}")
+        elif kind == "table":
+            tables.append(m.group("table"))
+        elif kind == "cli":
+            commands.append(m.group("cli"))
+        else:
+            routes.append(m.group("route"))
+    return endpoints, tables, commands, routes
 
 
 def build_scan(repo_path: Path) -> RepoScan:
-    files = [
-        str(p.relative_to(repo_path))
-        for p in sorted(repo_path.rglob("*"))
-        if p.is_file() and ".git" not in p.parts
-    ]
+    # Classify each path during the walk so it is matched once per hint set.
+    # os.walk roots all start with this prefix, so slicing replaces relpath().
+    base_len = len(os.path.join(repo_path, ""))
+    files: list[str] = []
+    candidates: list[Path] = []
+    test_files: list[str] = []
+    for root, dirs, fnames in os.walk(repo_path):
+        dirs[:] = [d for d in dirs if d not in _PRUNE_DIRS]
+        for fn in fnames:
+            if fn == ".git":
+                continue
+            rel = os.path.join(root, fn)[base_len:]
+            files.append(rel)
+            if _SCAN_HINT_RE.search(rel):
+                candidates.append(repo_path / rel)
+            if _TEST_HINT_RE.search(rel):
+                test_files.append(rel)
+    # Component-wise order, matching what sorting the Path objects used to give.
+    files.sort(key=lambda rel: rel.split(os.sep))
 
     api_endpoints: set[str] = set()
     db_tables: set[str] = set()
     cli_commands: set[str] = set()
     frontend_routes: set[str] = set()
 
-    endpoint_patterns = [
-        re.compile(r"@app\.(get|post|put|patch|delete)\(\s*['\"]([^'\"]+)['\"]", re.I),
-        re.compile(r"router\.(get|post|put|patch|delete)\(\s*['\"]([^'\"]+)['\"]", re.I),
-    ]
-    table_pattern = re.compile(r"\bCREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?([a-zA-Z0-9_]+)", re.I)
-    cli_pattern = re.compile(r"add_parser\(\s*['\"]([^'\"]+)['\"]")
-    route_patterns = [
-        re.compile(r"<Route\s+path=['\"]([^'\"]+)['\"]", re.I),
-        re.compile(r"path\s*:\s*['\"]([^'\"]+)['\"]", re.I),
-    ]
-
-    for rel in files:
-        p = repo_path / rel
-        lower = rel.lower()
-        if not any(
-            token in lower
-            for token in ("api.py", "router", "routes", "sql", "schema", "cli.py", "app.tsx", "routes.ts", "pages")
-        ):
-            continue
-
-        content = _safe_read(p)
-        if not content:
-            continue
-
-        for pat in endpoint_patterns:
-            for m in pat.finditer(content):
-                api_endpoints.add(f"{m.group(1).upper()} {m.group(2)}")
-
-        for m in table_pattern.finditer(content):
-            db_tables.add(m.group(1))
-
-        for m in cli_pattern.finditer(content):
-            cli_commands.add(m.group(1))
-
-        for pat in route_patterns:
-            for m in pat.finditer(content):
-                frontend_routes.add(m.group(1))
-
-    test_files = [
-        f
-        for f in files
-        if any(token in f.lower() for token in ("/tests/", "test_", "_test.", "spec."))
-    ]
+    # Reads release the GIL, so overlapping them hides per-file I/O latency.
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as pool:
+        for endpoints, tables, commands, routes in pool.map(_scan_file, candidates):
+            api_endpoints.update(endpoints)
+            db_tables.update(tables)
+            cli_commands.update(commands)
+            frontend_routes.update(routes)
 
     return RepoScan(
         repo_path=repo_path,
@@ -104,4 +152,4 @@ def build_scan(repo_path: Path) -> RepoScan:
 
 def write_scan(scan: RepoScan, output_path: Path) -> None:
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text(json.dumps(scan.to_dict(), indent=2), encoding="utf-8")
+    jsonio.write_json(output_path, scan.to_dict(), indent=True)
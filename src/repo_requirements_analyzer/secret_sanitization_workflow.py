@@ -6,15 +6,20 @@ import json
 import os
 import re
 import subprocess
-from datetime import datetime
+import time
 from pathlib import Path
 from typing import Any
 
 from agents import Agent, set_default_openai_api
 from agents.mcp import MCPServerManager, MCPServerStdio, create_static_tool_filter
 
+from . import jsonio
 from .code_agent import run_code_agent
-from .main import configure_openai_client_from_env, run_with_retries
+from .main import configure_openai_client_from_env, install_pidfd_child_watcher, run_with_retries
+
+_FENCE_OPEN_RE = re.compile(r"```json", flags=re.IGNORECASE)
+# JSON string literals (consumed whole, so braces inside them are ignored) or a brace.
+_JSON_BRACE_TOKEN_RE = re.compile(r'"(?:[^"\\]|\\.)*"|[{}]', flags=re.DOTALL)
 
 
 def clone_repo_fresh(repo: str, target_dir: Path) -> Path:
@@ -24,6 +29,7 @@ def clone_repo_fresh(repo: str, target_dir: Path) -> Path:
     completed = subprocess.run(cmd, capture_output=True, text=True)
     if completed.returncode != 0:
         raise RuntimeError(f"Failed to clone repository: {completed.stderr or completed.stdout}")
+    # Resolved once here so downstream consumers can use the path as-is.
     return clone_path.resolve()
 
 
@@ -56,7 +62,8 @@ def build_review_mcp_servers(repo_path: Path) -> list[MCPServerStdio]:
             "MCP servers are not installed. Install with: cd .mcp-node && npm install @modelcontextprotocol/server-filesystem @cyanheads/git-mcp-server"
         )
 
-    repo_abs = str(repo_path.resolve())
+    # clone_repo_fresh already returns a resolved path; only resolve other relative inputs.
+    repo_abs = str(repo_path if repo_path.is_absolute() else repo_path.resolve())
     runtime_path = os.environ.get("PATH", "").strip() or "/usr/local/bin:/usr/bin:/bin:/usr/sbin:/sbin"
     git_env = dict(os.environ)
     git_env.update(
@@ -151,6 +158,24 @@ Output format (strict JSON only):
 """
 
 
+def _first_balanced_object(content: str) -> str | None:
+    # Prefer an object inside a ```json fence, like models are asked to emit.
+    fence = _FENCE_OPEN_RE.search(content)
+    start = content.find("{", fence.end() if fence else 0)
+    if start < 0:
+        return None
+    depth = 0
+    for m in _JSON_BRACE_TOKEN_RE.finditer(content, start):
+        token = m.group()
+        if token == "{":
+            depth += 1
+        elif token == "}":
+            depth -= 1
+            if depth == 0:
+                return content[start : m.end()]
+    return None
+
+
 def _extract_json_from_text(text: str) -> dict[str, Any]:
     content = (text or "").strip()
     if not content:
@@ -163,10 +188,10 @@ def _extract_json_from_text(text: str) -> dict[str, Any]:
     except json.JSONDecodeError:
         pass
 
-    fenced = re.search(r"```json\s*(\{.*?\})\s*```", content, flags=re.DOTALL | re.IGNORECASE)
-    if fenced:
+    candidate = _first_balanced_object(content)
+    if candidate:
         try:
-            obj = json.loads(fenced.group(1))
+            obj = json.loads(candidate)
             if isinstance(obj, dict):
                 return obj
         except json.JSONDecodeError:
@@ -230,11 +255,11 @@ async def run_model_secret_review(
         output_text = str(result.final_output)
 
     review_output_path = run_dir / "secret-review-output.md"
-    review_output_path.write_text(output_text, encoding="utf-8")
+    review_output_path.write_bytes(output_text.encode("utf-8"))
 
     review_json = _extract_json_from_text(output_text)
     review_json_path = run_dir / "secret-review.json"
-    review_json_path.write_text(json.dumps(review_json, indent=2, ensure_ascii=True) + "\n", encoding="utf-8")
+    jsonio.write_json(review_json_path, review_json, indent=True)
 
     findings = review_json.get("findings", [])
     findings_count = len(findings) if isinstance(findings, list) else 0
@@ -292,7 +317,7 @@ async def run_workflow(args: argparse.Namespace) -> dict[str, Any]:
     workspace_root = Path(args.workspace).expanduser().resolve()
     workspace_root.mkdir(parents=True, exist_ok=True)
 
-    run_stamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    run_stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime())
     run_dir = workspace_root / f"secret-run-{run_stamp}"
     run_dir.mkdir(parents=True, exist_ok=True)
 
@@ -344,7 +369,7 @@ async def run_workflow(args: argparse.Namespace) -> dict[str, Any]:
         "code_agent_output_path": str(code_output_path),
     }
     summary_path = run_dir / "workflow-summary.json"
-    summary_path.write_text(json.dumps(summary, indent=2) + "\n", encoding="utf-8")
+    jsonio.write_json(summary_path, summary, indent=True)
 
     return {
         "workflow_run_dir": run_dir,
@@ -436,6 +461,7 @@ def parse_args() -> argparse.Namespace:
 
 def entrypoint() -> None:
     args = parse_args()
+    install_pidfd_child_watcher()
     result = asyncio.run(run_workflow(args))
     print(f"Workflow run dir: {result['workflow_run_dir']}")
     print(f"Summary: {result['summary_path']}")
@@ -1,10 +1,28 @@
 from __future__ import annotations
 
-import json
+import mmap
+import multiprocessing
+import os
 import re
+import subprocess
+import threading
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 
+from . import jsonio
+
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
 
 @dataclass
 class SecretFinding:
@@ -39,16 +57,19 @@ class SecretScan:
         }
 
 
-_IGNORE_SUBSTRINGS = (
-    "/.git/",
-    "/node_modules/",
-    "/dist/",
-    "/build/",
-    "/vendor/",
-    "/.next/",
-    "/coverage/",
-    "/.venv/",
-    "/venv/",
+# Directory names whose whole subtree is skipped (and reported once as excluded).
+_IGNORE_DIRS = frozenset(
+    {
+        ".git",
+        "node_modules",
+        "dist",
+        "build",
+        "vendor",
+        ".next",
+        "coverage",
+        ".venv",
+        "venv",
+    }
 )
 
 _TEXT_SUFFIX_ALLOWLIST = {
@@ -116,30 +137,213 @@ _FALSE_POSITIVE_PATTERNS: list[re.Pattern[str]] = [
 ]
 
 
-def _looks_binary(raw: bytes) -> bool:
-    return b"\x00" in raw
+def _fuse(patterns: list[re.Pattern[str]]) -> re.Pattern[str]:
+    # Global (?i) is only legal at the start of a pattern, so scope it per alternative.
+    parts = []
+    for pat in patterns:
+        src = pat.pattern
+        if src.startswith("(?i)"):
+            src = f"(?i:{src[4:]})"
+        parts.append(f"(?:{src})")
+    return re.compile("|".join(parts))
+
+
+def _linear_time(pattern: re.Pattern[str]):
+    # RE2 never backtracks, so pathological lines (e.g. minified JS) stay linear.
+    if re2 is None:
+        return None
+    try:
+        return re2.compile(pattern.pattern)
+    except re2.error:
+        return None
+
+
+# One search per line decides whether any rule (or false-positive marker) applies.
+_ANY_RULE_RE = _fuse([pattern for _, pattern in _RULES])
+_FALSE_POSITIVE_RE = _fuse(_FALSE_POSITIVE_PATTERNS)
+# RE2's \b and case folding differ from re's outside ASCII, so only ASCII lines use it.
+_ANY_RULE_RE2 = _linear_time(_ANY_RULE_RE)
+_FALSE_POSITIVE_RE2 = _linear_time(_FALSE_POSITIVE_RE)
+
+# Every rule match contains one of these literals: _CASE_ANCHORS verbatim, the
+# others in lowercased text. Characters that IGNORECASE folds onto ASCII letters (and İ,
+# whose lowercase changes length) disable the prefilter for that file.
+_CASE_ANCHORS = ("sk-", "ghp_", "AKIA", "AIza", "://")
+_NOCASE_ANCHORS = ("api", "secret", "token", "passw", "pwd")
+_CASEFOLD_SPECIALS = ("\u017f", "\u212a", "\u0131", "\u0130")
+# Line boundaries str.splitlines() honours besides "\n".
+_EXTRA_LINE_BREAKS = ("\r", "\x0b", "\x0c", "\x1c", "\x1d", "\x1e", "\x85", "\u2028", "\u2029")
+
+_POOL_CHUNKSIZE = 32
+
+
+def _compile_hyperscan():
+    # All rules in one block-mode database; only end offsets are needed to pick lines.
+    if hyperscan is None:
+        return None
+    try:
+        db = hyperscan.Database()
+        db.compile(
+            expressions=[pattern.pattern.encode("ascii") for _, pattern in _RULES],
+            ids=list(range(len(_RULES))),
+            elements=len(_RULES),
+        )
+    except hyperscan.error:
+        return None
+    return db
+
+
+_HYPERSCAN_DB = _compile_hyperscan()
+
+_REDACT_RE = re.compile(r"[A-Za-z0-9]{16,}")
+
+
+def _line_text(content: str) -> str:
+    # "\n"-joined splitlines() view; most files need no rebuild at all.
+    if any(sep in content for sep in _EXTRA_LINE_BREAKS):
+        return "\n".join(content.splitlines())
+    return content
+
+
+def _candidate_lines(text: str) -> Iterator[tuple[int, str]]:
+    if not text.isascii() and any(ch in text for ch in _CASEFOLD_SPECIALS):
+        yield from enumerate(text.split("\n"))
+        return
+    lowered = text.lower()
+    positions: list[int] = []
+    for haystack, anchors in ((text, _CASE_ANCHORS), (lowered, _NOCASE_ANCHORS)):
+        for anchor in anchors:
+            pos = haystack.find(anchor)
+            while pos >= 0:
+                positions.append(pos)
+                # One hit per line is enough; resume on the next line.
+                eol = haystack.find("\n", pos)
+                if eol < 0:
+                    break
+                pos = haystack.find(anchor, eol + 1)
+    yield from _lines_at(text, positions)
+
+
+def _hyperscan_lines(text: str) -> Iterator[tuple[int, str]]:
+    # ASCII only, so byte offsets are str offsets and \b / (?i) mean what re means.
+    # Matches spanning a newline just yield a line that re then rejects.
+    positions: list[int] = []
+
+    def on_match(rule_id: int, start: int, end: int, flags: int, context: object) -> None:
+        positions.append(end - 1)
+
+    _HYPERSCAN_DB.scan(text.encode("ascii"), match_event_handler=on_match)
+    yield from _lines_at(text, positions)
+
+
+def _lines_at(text: str, positions: list[int]) -> Iterator[tuple[int, str]]:
+    positions.sort()
+    # Line numbers come from hit offsets; only the hit lines are ever sliced out.
+    line_idx = 0
+    prev = 0
+    last_idx = -1
+    for pos in positions:
+        line_idx += text.count("\n", prev, pos)
+        prev = pos
+        if line_idx == last_idx:
+            continue
+        last_idx = line_idx
+        start = text.rfind("\n", 0, pos) + 1
+        end = text.find("\n", pos)
+        yield line_idx, text[start:] if end < 0 else text[start:end]
+
+
+def _looks_binary(raw: bytes | mmap.mmap) -> bool:
+    return raw.find(b"\x00") >= 0
 
 
 def _redact_snippet(text: str, max_len: int = 180) -> str:
-    redacted = re.sub(r"[A-Za-z0-9]{16,}", "***", text.strip())
+    redacted = _REDACT_RE.sub("***", text.strip())
     if len(redacted) <= max_len:
         return redacted
     return redacted[: max_len - 3] + "..."
 
 
-def _is_candidate_text_file(path: Path) -> bool:
-    if path.name.startswith(".env"):
+def _is_candidate_text_file(name: str) -> bool:
+    if name.startswith(".env"):
         return True
-    suffix = path.suffix.lower()
-    return suffix in _TEXT_SUFFIX_ALLOWLIST
+    # Path.suffix rules: a leading dot or a trailing dot means no suffix.
+    dot = name.rfind(".")
+    if dot <= 0 or dot == len(name) - 1:
+        return False
+    return name[dot:].lower() in _TEXT_SUFFIX_ALLOWLIST
+
+
+def _scan_dir(dir_path: str) -> tuple[list[str], list[str], list[str]]:
+    files: list[str] = []
+    subdirs: list[str] = []
+    pruned: list[str] = []
+    try:
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                # Same rules as rglob + is_file(): no descending into symlinked dirs,
+                # but symlinks to regular files count as files.
+                if entry.is_dir(follow_symlinks=False):
+                    (pruned if entry.name in _IGNORE_DIRS else subdirs).append(entry.path)
+                elif _is_candidate_text_file(entry.name) and entry.is_file():
+                    files.append(entry.path)
+    except OSError:
+        pass
+    return files, subdirs, pruned
+
 
+def _git_ls_ignored(repo_path: Path, *args: str) -> list[str]:
+    # Untracked paths the repo's ignore rules exclude; empty outside a work tree.
+    cmd = ["git", "-C", str(repo_path), "ls-files", "-z", "--others", "--ignored", "--exclude-standard", *args]
+    try:
+        completed = subprocess.run(cmd, capture_output=True)
+    except OSError:
+        return []
+    if completed.returncode != 0:
+        return []
+    return [p for p in completed.stdout.decode("utf-8", "surrogateescape").split("\0") if p]
 
-def _should_skip(rel_path: str) -> bool:
-    normalized = "/" + rel_path.replace("\\", "/")
-    for part in _IGNORE_SUBSTRINGS:
-        if part in normalized:
-            return True
-    return False
+
+def _git_ignored_dirs(repo_path: Path) -> tuple[set[str], list[str]]:
+    # Wholly ignored directories (build output, vendored trees) are pruned. Ignored
+    # files are still scanned: .env and friends are gitignored precisely because they
+    # hold secrets, so the .env* files inside pruned directories are returned as well.
+    dirs = {os.path.normpath(p) for p in _git_ls_ignored(repo_path, "--directory") if p.endswith("/")}
+    if not dirs:
+        return dirs, []
+    env_files: list[str] = []
+    for entry in _git_ls_ignored(repo_path, "--", ":(glob)**/.env*"):
+        rel = os.path.normpath(entry)
+        parts = rel.split(os.sep)
+        if any(part in _IGNORE_DIRS for part in parts[:-1]):
+            continue
+        in_pruned = any(os.sep.join(parts[:i]) in dirs for i in range(1, len(parts)))
+        if in_pruned and os.path.isfile(os.path.join(repo_path, rel)):
+            env_files.append(rel)
+    return dirs, env_files
+
+
+def _walk_files(repo_path: Path) -> tuple[list[str], list[str]]:
+    # Only candidate text files are returned; the name test runs on the DirEntry.
+    # Breadth-first, one scandir per directory per task; scandir releases the GIL.
+    base_len = len(os.path.join(repo_path, ""))
+    ignored_dirs, rels = _git_ignored_dirs(repo_path)
+    excluded: list[str] = []
+    pending = [os.fspath(repo_path)]
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as pool:
+        while pending:
+            level, pending = pending, []
+            for files, subdirs, pruned in pool.map(_scan_dir, level):
+                excluded.extend(d[base_len:] for d in pruned)
+                rels.extend(f[base_len:] for f in files)
+                for d in subdirs:
+                    if d[base_len:] in ignored_dirs:
+                        excluded.append(d[base_len:])
+                    else:
+                        pending.append(d)
+    # Component-wise order, matching what sorting the Path objects used to give.
+    rels.sort(key=lambda rel: rel.split(os.sep))
+    return rels, excluded
 
 
 def detect_stack_hints(repo_path: Path) -> list[str]:
@@ -161,41 +365,80 @@ def detect_stack_hints(repo_path: Path) -> list[str]:
     return sorted(hints)
 
 
-def build_secret_scan(repo_path: Path) -> SecretScan:
+def _prefetch(paths: list[Path]) -> None:
+    # Queue kernel readahead for every candidate up front, so on a cold cache the
+    # workers' sequential reads mostly hit the page cache.
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+
+def _scan_one_file(path: Path, rel: str) -> list[SecretFinding]:
     findings: list[SecretFinding] = []
-    excluded: list[str] = []
+    # Map instead of read_bytes(): the NUL probe and the decode both run on the
+    # page cache directly, so no bytes copy of the file is ever held.
+    with open(path, "rb") as handle:
+        if not os.fstat(handle.fileno()).st_size:
+            return findings
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as raw:
+            if _looks_binary(raw):
+                return findings
+            content = str(raw, "utf-8", "ignore")
+    if not content or content.isspace():
+        return findings
 
-    for path in sorted(repo_path.rglob("*")):
-        if not path.is_file():
-            continue
-        rel = str(path.relative_to(repo_path))
-        if _should_skip(rel):
-            excluded.append(rel)
-            continue
-        if not _is_candidate_text_file(path):
+    text = _line_text(content)
+    if _HYPERSCAN_DB is not None and text.isascii():
+        lines = _hyperscan_lines(text)
+    else:
+        lines = _candidate_lines(text)
+    for line_idx, line in lines:
+        any_rule, false_positive = _ANY_RULE_RE, _FALSE_POSITIVE_RE
+        if line.isascii():
+            any_rule = _ANY_RULE_RE2 or any_rule
+            false_positive = _FALSE_POSITIVE_RE2 or false_positive
+        if not any_rule.search(line) or false_positive.search(line):
             continue
+        # A line can trip several rules; report each one, in rule order.
+        for rule_id, pattern in _RULES:
+            if not pattern.search(line):
+                continue
+            findings.append(
+                SecretFinding(
+                    rule_id=rule_id,
+                    path=rel,
+                    line=line_idx + 1,
+                    snippet=_redact_snippet(line),
+                )
+            )
+    return findings
 
-        raw = path.read_bytes()
-        if _looks_binary(raw):
-            continue
-        content = raw.decode("utf-8", errors="ignore")
-        if not content:
-            continue
 
-        for idx, line in enumerate(content.splitlines(), start=1):
-            for rule_id, pattern in _RULES:
-                if not pattern.search(line):
-                    continue
-                if any(fp.search(line) for fp in _FALSE_POSITIVE_PATTERNS):
-                    continue
-                findings.append(
-                    SecretFinding(
-                        rule_id=rule_id,
-                        path=rel,
-                        line=idx,
-                        snippet=_redact_snippet(line),
-                    )
-                )
+def build_secret_scan(repo_path: Path, num_workers: int | None = None) -> SecretScan:
+    findings: list[SecretFinding] = []
+    rels, excluded = _walk_files(repo_path)
+    pairs = [(repo_path / rel, rel) for rel in rels]
+
+    # Files are independent, so spread the regex work across cores; starmap keeps order.
+    workers = min(num_workers or os.cpu_count() or 1, len(pairs))
+    if workers > 1 and len(pairs) > _POOL_CHUNKSIZE:
+        with multiprocessing.Pool(workers) as pool:
+            # Started after the workers are forked, so no child inherits a live thread.
+            if hasattr(os, "posix_fadvise"):
+                threading.Thread(target=_prefetch, args=([path for path, _ in pairs],), daemon=True).start()
+            results = pool.starmap(_scan_one_file, pairs, chunksize=_POOL_CHUNKSIZE)
+    else:
+        results = [_scan_one_file(path, rel) for path, rel in pairs]
+    for file_findings in results:
+        findings.extend(file_findings)
 
     return SecretScan(
         repo_path=repo_path,
@@ -207,5 +450,5 @@ def build_secret_scan(repo_path: Path) -> SecretScan:
 
 def write_secret_scan(scan: SecretScan, output_path: Path) -> None:
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text(json.dumps(scan.to_dict(), indent=2) + "\n", encoding="utf-8")
+    jsonio.write_json(output_path, scan.to_dict(), indent=True)
 
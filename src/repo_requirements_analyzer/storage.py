@@ -32,12 +32,23 @@ class EvidenceRecord:
     source_paths: str
 
 
-def connect_db(db_path: Path) -> sqlite3.Connection:
+def connect_db(db_path: Path, *, check_same_thread: bool = True) -> sqlite3.Connection:
     db_path = db_path.expanduser().resolve()
     db_path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(str(db_path))
+    conn = sqlite3.connect(str(db_path), check_same_thread=check_same_thread)
     conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON;")
+    # WAL lets web UI readers proceed during writes; synchronous=NORMAL skips the
+    # per-commit fsync (WAL is still durable across application crashes).
+    conn.executescript(
+        """
+        PRAGMA foreign_keys = ON;
+        PRAGMA journal_mode = WAL;
+        PRAGMA synchronous = NORMAL;
+        PRAGMA temp_store = MEMORY;
+        PRAGMA mmap_size = 268435456;
+        PRAGMA cache_size = -65536;
+        """
+    )
     return conn
 
 
@@ -94,6 +105,11 @@ def init_schema(conn: sqlite3.Connection) -> None:
             source_paths TEXT NOT NULL,
             FOREIGN KEY (report_id) REFERENCES reports(id) ON DELETE CASCADE
         );
+
+        CREATE INDEX IF NOT EXISTS idx_features_report ON features(report_id);
+        CREATE INDEX IF NOT EXISTS idx_stories_report ON stories(report_id);
+        CREATE INDEX IF NOT EXISTS idx_recommendations_report ON recommendations(report_id);
+        CREATE INDEX IF NOT EXISTS idx_evidence_report ON evidence(report_id);
         """
     )
     _ensure_report_columns(conn)
@@ -110,6 +126,20 @@ def _ensure_report_columns(conn: sqlite3.Connection) -> None:
         conn.execute("ALTER TABLE reports ADD COLUMN validation_error_count INTEGER NOT NULL DEFAULT 0")
 
 
+# Insert statements, kept in one place next to the helpers that use them.
+_SQL_INSERT_REPORT = """
+    INSERT INTO reports (
+        title, repo, model, report_path, markdown, created_at,
+        validation_status, validation_errors, validation_error_count
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_SQL_INSERT_FEATURES = "INSERT INTO features (report_id, domain, feature_text) VALUES (?, ?, ?)"
+_SQL_INSERT_STORIES = "INSERT INTO stories (report_id, story_num, persona, story_text, evidence) VALUES (?, ?, ?, ?, ?)"
+_SQL_INSERT_RECOMMENDATIONS = "INSERT INTO recommendations (report_id, item_num, recommendation_text) VALUES (?, ?, ?)"
+_SQL_INSERT_EVIDENCE = "INSERT INTO evidence (report_id, item, source_paths) VALUES (?, ?, ?)"
+
+
 def insert_report(
     conn: sqlite3.Connection,
     *,
@@ -121,16 +151,11 @@ def insert_report(
     validation_status: str = "unknown",
     validation_errors: str = "",
     validation_error_count: int = 0,
+    commit: bool = True,
 ) -> int:
     created_at = datetime.now(timezone.utc).isoformat()
     cur = conn.execute(
-        """
-        INSERT INTO reports (
-            title, repo, model, report_path, markdown, created_at,
-            validation_status, validation_errors, validation_error_count
-        )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
+        _SQL_INSERT_REPORT,
         (
             title,
             repo,
@@ -143,45 +168,87 @@ def insert_report(
             validation_error_count,
         ),
     )
-    conn.commit()
+    if commit:
+        conn.commit()
     return int(cur.lastrowid)
 
 
-def insert_features(conn: sqlite3.Connection, report_id: int, features: list[FeatureRecord]) -> None:
+def insert_features(conn: sqlite3.Connection, report_id: int, features: list[FeatureRecord], *, commit: bool = True) -> None:
     if not features:
         return
     conn.executemany(
-        "INSERT INTO features (report_id, domain, feature_text) VALUES (?, ?, ?)",
-        [(report_id, f.domain, f.feature_text) for f in features],
+        _SQL_INSERT_FEATURES,
+        ((report_id, f.domain, f.feature_text) for f in features),
     )
-    conn.commit()
+    if commit:
+        conn.commit()
 
 
-def insert_stories(conn: sqlite3.Connection, report_id: int, stories: list[StoryRecord]) -> None:
+def insert_stories(conn: sqlite3.Connection, report_id: int, stories: list[StoryRecord], *, commit: bool = True) -> None:
     if not stories:
         return
     conn.executemany(
-        "INSERT INTO stories (report_id, story_num, persona, story_text, evidence) VALUES (?, ?, ?, ?, ?)",
-        [(report_id, s.story_num, s.persona, s.story_text, s.evidence) for s in stories],
+        _SQL_INSERT_STORIES,
+        ((report_id, s.story_num, s.persona, s.story_text, s.evidence) for s in stories),
     )
-    conn.commit()
+    if commit:
+        conn.commit()
 
 
-def insert_recommendations(conn: sqlite3.Connection, report_id: int, recs: list[RecommendationRecord]) -> None:
+def insert_recommendations(conn: sqlite3.Connection, report_id: int, recs: list[RecommendationRecord], *, commit: bool = True) -> None:
     if not recs:
         return
     conn.executemany(
-        "INSERT INTO recommendations (report_id, item_num, recommendation_text) VALUES (?, ?, ?)",
-        [(report_id, r.item_num, r.text) for r in recs],
+        _SQL_INSERT_RECOMMENDATIONS,
+        ((report_id, r.item_num, r.text) for r in recs),
     )
-    conn.commit()
+    if commit:
+        conn.commit()
 
 
-def insert_evidence(conn: sqlite3.Connection, report_id: int, evidence: list[EvidenceRecord]) -> None:
+def insert_evidence(conn: sqlite3.Connection, report_id: int, evidence: list[EvidenceRecord], *, commit: bool = True) -> None:
     if not evidence:
         return
     conn.executemany(
-        "INSERT INTO evidence (report_id, item, source_paths) VALUES (?, ?, ?)",
-        [(report_id, e.item, e.source_paths) for e in evidence],
+        _SQL_INSERT_EVIDENCE,
+        ((report_id, e.item, e.source_paths) for e in evidence),
     )
-    conn.commit()
+    if commit:
+        conn.commit()
+
+
+def insert_report_bundle(
+    conn: sqlite3.Connection,
+    *,
+    title: str,
+    repo: str | None,
+    model: str | None,
+    report_path: str | None,
+    markdown: str,
+    validation_status: str = "unknown",
+    validation_errors: str = "",
+    validation_error_count: int = 0,
+    features: list[FeatureRecord],
+    stories: list[StoryRecord],
+    recommendations: list[RecommendationRecord],
+    evidence: list[EvidenceRecord],
+) -> int:
+    # One transaction (and one commit) for the report and all of its child rows.
+    with conn:
+        report_id = insert_report(
+            conn,
+            title=title,
+            repo=repo,
+            model=model,
+            report_path=report_path,
+            markdown=markdown,
+            validation_status=validation_status,
+            validation_errors=validation_errors,
+            validation_error_count=validation_error_count,
+            commit=False,
+        )
+        insert_features(conn, report_id, features, commit=False)
+        insert_stories(conn, report_id, stories, commit=False)
+        insert_recommendations(conn, report_id, recommendations, commit=False)
+        insert_evidence(conn, report_id, evidence, commit=False)
+    return report_id
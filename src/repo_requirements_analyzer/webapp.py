@@ -1,7 +1,11 @@
 from __future__ import annotations
 
 import argparse
+import functools
 import html
+import queue
+import sqlite3
+import threading
 from http import HTTPStatus
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
@@ -59,13 +63,248 @@ def _layout(title: str, body: str) -> str:
 </html>"""
 
 
+_BADGE_CLASSES = {"passed": "badge badge-pass", "warning": "badge badge-warn"}
+_STORY_STATUSES = ("new", "approved", "needs_revision", "rejected")
+_REC_STATUSES = ("proposed", "accepted", "deferred", "rejected")
+
+# Row templates are filled with already-escaped values via str.format_map.
+_HOME_ROW_TMPL = (
+    "<tr>"
+    "<td>{id}</td>"
+    "<td><a href='/report?id={id}'>{title}</a></td>"
+    "<td>{repo}</td>"
+    "<td>{model}</td>"
+    "<td><span class='{badge_class}'>{status}</span> ({error_count})</td>"
+    "<td>{story_count}</td>"
+    "<td>{feature_count}</td>"
+    "<td>{rec_count}</td>"
+    "<td class='muted'>{created_at}</td>"
+    "</tr>"
+)
+_STORY_ROW_TMPL = (
+    "<tr><td colspan='6'>"
+    "<form method='post' action='/story/update'>"
+    "<input type='hidden' name='id' value='{id}'>"
+    "<input type='hidden' name='report_id' value='{report_id}'>"
+    "<div class='row'>"
+    "<div>"
+    "<strong>#{story_num}</strong> "
+    "{persona}<br>"
+    "{story_text}<br>"
+    "<span class='muted'>Evidence: {evidence}</span>"
+    "</div>"
+    "<div>"
+    "<label>Status</label>"
+    "<select name='status'>{options}</select>"
+    "<label>Notes</label>"
+    "<textarea name='notes'>{notes}</textarea>"
+    "<button type='submit'>Save Story</button>"
+    "</div></div></form></td></tr>"
+)
+_REC_ROW_TMPL = (
+    "<tr><td colspan='4'>"
+    "<form method='post' action='/rec/update'>"
+    "<input type='hidden' name='id' value='{id}'>"
+    "<input type='hidden' name='report_id' value='{report_id}'>"
+    "<strong>{item_num}.</strong> {text}<br>"
+    "<label>Status</label>"
+    "<select name='status'>{options}</select>"
+    "<label>Notes</label>"
+    "<textarea name='notes'>{notes}</textarea>"
+    "<button type='submit'>Save Recommendation</button>"
+    "</form></td></tr>"
+)
+
+
+@functools.lru_cache(maxsize=64)
+def _status_options(current: str, choices: tuple[str, ...]) -> str:
+    return "".join(f"<option {'selected' if current == c else ''}>{c}</option>" for c in choices)
+
+
+def _home_row(row: sqlite3.Row) -> str:
+    validation_status = (row["validation_status"] or "unknown").lower()
+    return _HOME_ROW_TMPL.format_map(
+        {
+            "id": row["id"],
+            "title": html.escape(row["title"]),
+            "repo": html.escape(row["repo"] or ""),
+            "model": html.escape(row["model"] or ""),
+            "badge_class": _BADGE_CLASSES.get(validation_status, "badge badge-unknown"),
+            "status": html.escape(validation_status),
+            "error_count": row["validation_error_count"],
+            "story_count": row["story_count"],
+            "feature_count": row["feature_count"],
+            "rec_count": row["rec_count"],
+            "created_at": html.escape(row["created_at"]),
+        }
+    )
+
+
+class _ConnectionPool:
+    # ThreadingHTTPServer runs each request on a fresh thread, so thread-local caching
+    # would never hit; idle connections are handed between threads instead. A pooled
+    # connection is only ever used by one request at a time.
+    def __init__(self, db_path: Path, max_idle: int = 8) -> None:
+        self.db_path = db_path
+        # Bumped after each write made through this server; part of the page cache key.
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue(maxsize=max_idle)
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return connect_db(self.db_path, check_same_thread=False)
+
+    def bump_generation(self) -> None:
+        with self._lock:
+            self.generation += 1
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+
+def _render_home(conn: sqlite3.Connection) -> str:
+    rows = conn.execute(
+        """
+        SELECT
+            r.id, r.title, r.repo, r.model, r.created_at,
+            r.validation_status, r.validation_error_count,
+            COALESCE(s.n, 0) AS story_count,
+            COALESCE(f.n, 0) AS feature_count,
+            COALESCE(rc.n, 0) AS rec_count
+        FROM reports r
+        LEFT JOIN (SELECT report_id, COUNT(*) AS n FROM stories GROUP BY report_id) s ON s.report_id=r.id
+        LEFT JOIN (SELECT report_id, COUNT(*) AS n FROM features GROUP BY report_id) f ON f.report_id=r.id
+        LEFT JOIN (SELECT report_id, COUNT(*) AS n FROM recommendations GROUP BY report_id) rc ON rc.report_id=r.id
+        ORDER BY r.id DESC
+        """
+    ).fetchall()
+
+    rows_html = "".join(_home_row(row) for row in rows) or "<tr><td colspan='9'>No reports yet.</td></tr>"
+    body = (
+        "<div class='card'>"
+        "<h1>Reports</h1>"
+        "<p class='muted'>Ingest markdown reports, then browse and edit stories/recommendations here.</p>"
+        "<table><thead><tr><th>ID</th><th>Title</th><th>Repo</th><th>Model</th><th>Quality</th><th>Stories</th><th>Features</th><th>Recs</th><th>Created</th></tr></thead>"
+        f"<tbody>{rows_html}</tbody></table>"
+        "</div>"
+    )
+    return _layout("Reports", body)
+
+
+def _render_report(conn: sqlite3.Connection, report_id: int) -> str:
+    report = conn.execute("SELECT * FROM reports WHERE id=?", (report_id,)).fetchone()
+    if not report:
+        return _layout("Not Found", "<div class='card'>Report not found.</div>")
+
+    features = conn.execute(
+        "SELECT domain, feature_text FROM features WHERE report_id=? ORDER BY domain, id",
+        (report_id,),
+    ).fetchall()
+    stories = conn.execute(
+        "SELECT * FROM stories WHERE report_id=? ORDER BY COALESCE(story_num, 9999), id",
+        (report_id,),
+    ).fetchall()
+    recs = conn.execute(
+        "SELECT * FROM recommendations WHERE report_id=? ORDER BY COALESCE(item_num, 9999), id",
+        (report_id,),
+    ).fetchall()
+
+    validation_status = (report["validation_status"] or "unknown").lower()
+    badge_class = _BADGE_CLASSES.get(validation_status, "badge badge-unknown")
+
+    validation_errors = [line.strip() for line in (report["validation_errors"] or "").splitlines() if line.strip()]
+    validation_errors_html = (
+        "<ul>" + "".join(f"<li>{html.escape(err)}</li>" for err in validation_errors) + "</ul>"
+        if validation_errors
+        else "<p class='muted'>No quality warnings.</p>"
+    )
+
+    feature_rows = "".join(
+        f"<tr><td>{html.escape(r['domain'])}</td><td>{html.escape(r['feature_text'])}</td></tr>" for r in features
+    ) or "<tr><td colspan='2'>No features parsed.</td></tr>"
+
+    story_rows = "".join(
+        _STORY_ROW_TMPL.format_map(
+            {
+                "id": s["id"],
+                "report_id": report_id,
+                "story_num": html.escape(str(s["story_num"] or "")),
+                "persona": html.escape(s["persona"]),
+                "story_text": html.escape(s["story_text"]),
+                "evidence": html.escape(s["evidence"] or ""),
+                "options": _status_options(s["status"], _STORY_STATUSES),
+                "notes": html.escape(s["notes"] or ""),
+            }
+        )
+        for s in stories
+    )
+    rec_rows = "".join(
+        _REC_ROW_TMPL.format_map(
+            {
+                "id": r["id"],
+                "report_id": report_id,
+                "item_num": html.escape(str(r["item_num"] or "")),
+                "text": html.escape(r["recommendation_text"]),
+                "options": _status_options(r["status"], _REC_STATUSES),
+                "notes": html.escape(r["notes"] or ""),
+            }
+        )
+        for r in recs
+    )
+
+    body = (
+        "<div class='card'>"
+        "<a href='/'>Back to reports</a>"
+        f"<h1>Report #{report['id']}: {html.escape(report['title'])}</h1>"
+        f"<p class='muted'>Repo: {html.escape(report['repo'] or '')}<br>Model: {html.escape(report['model'] or '')}</p>"
+        "</div>"
+        "<div class='card'>"
+        "<h2>Quality Validation</h2>"
+        f"<p><span class='{badge_class}'>{html.escape(validation_status)}</span> "
+        f"warnings: {report['validation_error_count']}</p>"
+        f"{validation_errors_html}"
+        "</div>"
+        "<div class='card'><h2>Features</h2><table><thead><tr><th>Domain</th><th>Feature</th></tr></thead>"
+        f"<tbody>{feature_rows}</tbody></table></div>"
+        "<div class='card'><h2>User Stories</h2><table><tbody>"
+        f"{story_rows or '<tr><td>No stories parsed.</td></tr>'}</tbody></table></div>"
+        "<div class='card'><h2>Recommendations</h2><table><tbody>"
+        f"{rec_rows or '<tr><td>No recommendations parsed.</td></tr>'}</tbody></table></div>"
+        "<div class='card'><h2>Raw Markdown</h2>"
+        f"<pre class='mono'>{html.escape(report['markdown'])}</pre></div>"
+    )
+    return _layout(f"Report {report_id}", body)
+
+
+# Keyed on the database version from AppHandler._db_version, so any write moves
+# lookups to fresh keys and stale pages simply age out. Report pages embed the
+# full raw markdown, so only a few recent pages are kept.
+@functools.lru_cache(maxsize=32)
+def _cached_page(pool: _ConnectionPool, report_id: int | None, version: tuple[int, ...]) -> str:
+    conn = pool.acquire()
+    try:
+        return _render_home(conn) if report_id is None else _render_report(conn, report_id)
+    finally:
+        pool.release(conn)
+
+
 class AppHandler(BaseHTTPRequestHandler):
     db_path: Path
+    pool: _ConnectionPool
 
-    def _open(self):
-        conn = connect_db(self.db_path)
-        init_schema(conn)
-        return conn
+    def _open(self) -> sqlite3.Connection:
+        return self.pool.acquire()
+
+    def _close(self, conn: sqlite3.Connection) -> None:
+        self.pool.release(conn)
 
     def _send_html(self, text: str, status: int = HTTPStatus.OK) -> None:
         payload = text.encode("utf-8")
@@ -118,173 +357,31 @@ class AppHandler(BaseHTTPRequestHandler):
                 ),
             )
         conn.commit()
-        conn.close()
+        self._close(conn)
+        self.pool.bump_generation()
 
         self.send_response(HTTPStatus.SEE_OTHER)
         self.send_header("Location", f"/report?id={report_id}")
         self.end_headers()
 
-    def render_home(self) -> str:
-        conn = self._open()
-        rows = conn.execute(
-            """
-            SELECT
-                r.id, r.title, r.repo, r.model, r.created_at,
-                r.validation_status, r.validation_error_count,
-                (SELECT COUNT(*) FROM stories s WHERE s.report_id=r.id) AS story_count,
-                (SELECT COUNT(*) FROM features f WHERE f.report_id=r.id) AS feature_count,
-                (SELECT COUNT(*) FROM recommendations rc WHERE rc.report_id=r.id) AS rec_count
-            FROM reports r
-            ORDER BY r.id DESC
-            """
-        ).fetchall()
-        conn.close()
-
-        table_rows = []
-        for row in rows:
-            validation_status = (row["validation_status"] or "unknown").lower()
-            if validation_status == "passed":
-                badge_class = "badge badge-pass"
-            elif validation_status == "warning":
-                badge_class = "badge badge-warn"
+    def _db_version(self) -> tuple[int, ...]:
+        # WAL commits only touch the -wal file until a checkpoint, so both files are
+        # stat'ed; the generation catches this process's writes within one mtime tick.
+        version = [self.pool.generation]
+        for path in (self.db_path, self.db_path.with_name(self.db_path.name + "-wal")):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                version += (0, 0)
             else:
-                badge_class = "badge badge-unknown"
-            table_rows.append(
-                "<tr>"
-                f"<td>{row['id']}</td>"
-                f"<td><a href='/report?id={row['id']}'>{html.escape(row['title'])}</a></td>"
-                f"<td>{html.escape(row['repo'] or '')}</td>"
-                f"<td>{html.escape(row['model'] or '')}</td>"
-                f"<td><span class='{badge_class}'>{html.escape(validation_status)}</span> ({row['validation_error_count']})</td>"
-                f"<td>{row['story_count']}</td>"
-                f"<td>{row['feature_count']}</td>"
-                f"<td>{row['rec_count']}</td>"
-                f"<td class='muted'>{html.escape(row['created_at'])}</td>"
-                "</tr>"
-            )
+                version += (st.st_mtime_ns, st.st_size)
+        return tuple(version)
 
-        rows_html = "".join(table_rows) if table_rows else "<tr><td colspan='9'>No reports yet.</td></tr>"
-        body = (
-            "<div class='card'>"
-            "<h1>Reports</h1>"
-            "<p class='muted'>Ingest markdown reports, then browse and edit stories/recommendations here.</p>"
-            "<table><thead><tr><th>ID</th><th>Title</th><th>Repo</th><th>Model</th><th>Quality</th><th>Stories</th><th>Features</th><th>Recs</th><th>Created</th></tr></thead>"
-            f"<tbody>{rows_html}</tbody></table>"
-            "</div>"
-        )
-        return _layout("Reports", body)
+    def render_home(self) -> str:
+        return _cached_page(self.pool, None, self._db_version())
 
     def render_report(self, report_id: int) -> str:
-        conn = self._open()
-        report = conn.execute("SELECT * FROM reports WHERE id=?", (report_id,)).fetchone()
-        if not report:
-            conn.close()
-            return _layout("Not Found", "<div class='card'>Report not found.</div>")
-
-        features = conn.execute(
-            "SELECT domain, feature_text FROM features WHERE report_id=? ORDER BY domain, id",
-            (report_id,),
-        ).fetchall()
-        stories = conn.execute(
-            "SELECT * FROM stories WHERE report_id=? ORDER BY COALESCE(story_num, 9999), id",
-            (report_id,),
-        ).fetchall()
-        recs = conn.execute(
-            "SELECT * FROM recommendations WHERE report_id=? ORDER BY COALESCE(item_num, 9999), id",
-            (report_id,),
-        ).fetchall()
-        conn.close()
-
-        validation_status = (report["validation_status"] or "unknown").lower()
-        if validation_status == "passed":
-            badge_class = "badge badge-pass"
-        elif validation_status == "warning":
-            badge_class = "badge badge-warn"
-        else:
-            badge_class = "badge badge-unknown"
-
-        validation_errors = [line.strip() for line in (report["validation_errors"] or "").splitlines() if line.strip()]
-        validation_errors_html = (
-            "<ul>" + "".join(f"<li>{html.escape(err)}</li>" for err in validation_errors) + "</ul>"
-            if validation_errors
-            else "<p class='muted'>No quality warnings.</p>"
-        )
-
-        feature_rows = "".join(
-            f"<tr><td>{html.escape(r['domain'])}</td><td>{html.escape(r['feature_text'])}</td></tr>" for r in features
-        ) or "<tr><td colspan='2'>No features parsed.</td></tr>"
-
-        story_rows = []
-        for s in stories:
-            story_rows.append(
-                "<tr><td colspan='6'>"
-                "<form method='post' action='/story/update'>"
-                f"<input type='hidden' name='id' value='{s['id']}'>"
-                f"<input type='hidden' name='report_id' value='{report_id}'>"
-                "<div class='row'>"
-                "<div>"
-                f"<strong>#{html.escape(str(s['story_num'] or ''))}</strong> "
-                f"{html.escape(s['persona'])}<br>"
-                f"{html.escape(s['story_text'])}<br>"
-                f"<span class='muted'>Evidence: {html.escape(s['evidence'] or '')}</span>"
-                "</div>"
-                "<div>"
-                "<label>Status</label>"
-                "<select name='status'>"
-                f"<option {'selected' if s['status']=='new' else ''}>new</option>"
-                f"<option {'selected' if s['status']=='approved' else ''}>approved</option>"
-                f"<option {'selected' if s['status']=='needs_revision' else ''}>needs_revision</option>"
-                f"<option {'selected' if s['status']=='rejected' else ''}>rejected</option>"
-                "</select>"
-                "<label>Notes</label>"
-                f"<textarea name='notes'>{html.escape(s['notes'] or '')}</textarea>"
-                "<button type='submit'>Save Story</button>"
-                "</div></div></form></td></tr>"
-            )
-
-        rec_rows = []
-        for r in recs:
-            rec_rows.append(
-                "<tr><td colspan='4'>"
-                "<form method='post' action='/rec/update'>"
-                f"<input type='hidden' name='id' value='{r['id']}'>"
-                f"<input type='hidden' name='report_id' value='{report_id}'>"
-                f"<strong>{html.escape(str(r['item_num'] or ''))}.</strong> {html.escape(r['recommendation_text'])}<br>"
-                "<label>Status</label>"
-                "<select name='status'>"
-                f"<option {'selected' if r['status']=='proposed' else ''}>proposed</option>"
-                f"<option {'selected' if r['status']=='accepted' else ''}>accepted</option>"
-                f"<option {'selected' if r['status']=='deferred' else ''}>deferred</option>"
-                f"<option {'selected' if r['status']=='rejected' else ''}>rejected</option>"
-                "</select>"
-                "<label>Notes</label>"
-                f"<textarea name='notes'>{html.escape(r['notes'] or '')}</textarea>"
-                "<button type='submit'>Save Recommendation</button>"
-                "</form></td></tr>"
-            )
-
-        body = (
-            "<div class='card'>"
-            "<a href='/'>Back to reports</a>"
-            f"<h1>Report #{report['id']}: {html.escape(report['title'])}</h1>"
-            f"<p class='muted'>Repo: {html.escape(report['repo'] or '')}<br>Model: {html.escape(report['model'] or '')}</p>"
-            "</div>"
-            "<div class='card'>"
-            "<h2>Quality Validation</h2>"
-            f"<p><span class='{badge_class}'>{html.escape(validation_status)}</span> "
-            f"warnings: {report['validation_error_count']}</p>"
-            f"{validation_errors_html}"
-            "</div>"
-            "<div class='card'><h2>Features</h2><table><thead><tr><th>Domain</th><th>Feature</th></tr></thead>"
-            f"<tbody>{feature_rows}</tbody></table></div>"
-            "<div class='card'><h2>User Stories</h2><table><tbody>"
-            f"{''.join(story_rows) if story_rows else '<tr><td>No stories parsed.</td></tr>'}</tbody></table></div>"
-            "<div class='card'><h2>Recommendations</h2><table><tbody>"
-            f"{''.join(rec_rows) if rec_rows else '<tr><td>No recommendations parsed.</td></tr>'}</tbody></table></div>"
-            "<div class='card'><h2>Raw Markdown</h2>"
-            f"<pre class='mono'>{html.escape(report['markdown'])}</pre></div>"
-        )
-        return _layout(f"Report {report_id}", body)
+        return _cached_page(self.pool, report_id, self._db_version())
 
 
 def parse_args() -> argparse.Namespace:
@@ -298,7 +395,13 @@ def parse_args() -> argparse.Namespace:
 def entrypoint() -> None:
     args = parse_args()
     db_path = Path(args.db).expanduser().resolve()
-    handler = type("BoundHandler", (AppHandler,), {"db_path": db_path})
+    # The schema is created once here, so request connections skip init_schema.
+    conn = connect_db(db_path)
+    try:
+        init_schema(conn)
+    finally:
+        conn.close()
+    handler = type("BoundHandler", (AppHandler,), {"db_path": db_path, "pool": _ConnectionPool(db_path)})
     server = ThreadingHTTPServer((args.host, args.port), handler)
     print(f"Serving web UI at http://{args.host}:{args.port} (db={db_path})")
     server.serve_forever()
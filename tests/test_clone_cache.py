@@ -0,0 +1,42 @@
+import shutil
+import subprocess
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from repo_requirements_analyzer.main import _clone_from_cache
+
+
+def _git(*args: str) -> None:
+    subprocess.run(["git", *args], check=True, capture_output=True)
+
+
+@unittest.skipIf(shutil.which("git") is None, "git is not installed")
+class CloneCacheTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        source = self.root / "source"
+        _git("init", "-q", str(source))
+        for i in range(200):
+            (source / f"f{i}.txt").write_text(f"{i}\n" * 200)
+        _git("-C", str(source), "add", ".")
+        _git("-C", str(source), "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", "init")
+        self.remote = source.as_uri()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_concurrent_runs_share_one_cache_entry(self):
+        cache = self.root / "repo-cache"
+        targets = [self.root / f"run-{i}" / "repo" for i in range(4)]
+        with ThreadPoolExecutor(len(targets)) as pool:
+            results = list(pool.map(lambda target: _clone_from_cache(self.remote, target, cache), targets))
+        self.assertEqual(results, [True] * len(targets))
+        for target in targets:
+            self.assertTrue((target / "f199.txt").is_file())
+
+
+if __name__ == "__main__":
+    unittest.main()
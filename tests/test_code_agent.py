@@ -0,0 +1,28 @@
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+
+from repo_requirements_analyzer.code_agent import _ShellSession
+from repo_requirements_analyzer.main import _is_windows
+
+
+@unittest.skipIf(_is_windows(), "the shell session is POSIX only")
+class ShellSessionTests(unittest.TestCase):
+    def test_background_output_stays_with_its_command(self):
+        async def scenario():
+            session = _ShellSession(Path(tempfile.gettempdir()))
+            try:
+                first = await session.run("(sleep 0.2; echo LATE_FROM_BG) &", 5000)
+                second = await session.run("echo next", 5000)
+            finally:
+                await session.close()
+            return first, second
+
+        first, second = asyncio.run(scenario())
+        self.assertEqual(first[:3], (0, "LATE_FROM_BG\n", ""))
+        self.assertEqual(second[:3], (0, "next\n", ""))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,21 @@
+import asyncio
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from repo_requirements_analyzer.main import _is_windows, _run_batched_commands
+
+
+@unittest.skipIf(_is_windows(), "POSIX shell semantics")
+class RunBatchedCommandsTests(unittest.TestCase):
+    def test_background_child_holding_stderr_cannot_outlive_timeout(self):
+        started = time.perf_counter()
+        runs = asyncio.run(_run_batched_commands(["sleep 30 >&2 &", "echo hi"], Path(tempfile.gettempdir()), 1))
+        self.assertLess(time.perf_counter() - started, 5)
+        self.assertEqual([run.exit_code for run in runs], [0, 0])
+        self.assertEqual(runs[1].stdout, "hi\n")
+
+
+if __name__ == "__main__":
+    unittest.main()